@@ -0,0 +1,318 @@
+# app_loadgen.py
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from inference_loadgen import percentile
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = 'main.py'
+CHAT_QUESTIONS = [
+    "Apa arti hasil analisis saya?",
+    "Makanan apa yang baik untuk menurunkan kolesterol?",
+    "Olahraga apa yang aman untuk jantung saya?",
+    "Apa itu depresi ST?",
+    "Seberapa sering saya perlu cek tekanan darah?",
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid):
+    """RSS proses server (MB) dari /proc; None jika tidak tersedia (non-Linux)."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def start_server(port, env, log_file, startup_timeout=60.0):
+    """Menjalankan `streamlit run main.py` headless di port `port` dan menunggu sampai port menerima koneksi."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_SCRIPT, "--server.headless", "true",
+         "--server.address", "127.0.0.1", "--server.port", str(port),
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server Streamlit berhenti saat start (kode {server.returncode}).")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server Streamlit tidak siap dalam {startup_timeout:.0f} detik.")
+
+
+class BrowserSession:
+    """
+    Satu pengguna simulasi: koneksi websocket ke server seperti tab browser. Menyimpan id widget dari
+    elemen yang dikirim server dan nilai widget yang sudah diubah, lalu mengirim keduanya di setiap rerun.
+    """
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = []
+        self.states = {}
+
+    async def connect(self):
+        import websockets
+
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def widget_id(self, kind, label_part=""):
+        return next(widget_id for k, label, widget_id in self.widgets if k == kind and label_part in label)
+
+    def set_number(self, label_part, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=self.widget_id("number_input", label_part))
+        state.double_value = value
+        self.states[state.id] = state
+
+    async def rerun(self, step, latencies, triggers=()):
+        """Satu interaksi: kirim state widget, tunggu sampai skrip selesai (termasuk st.rerun lanjutan)."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.widget_states.widgets.extend([*self.states.values(), *triggers])
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        await asyncio.wait_for(self._until_finished(step), self.timeout)
+        latencies.append((step, (time.perf_counter() - t0) * 1000.0))
+
+    async def _until_finished(self, step):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        widgets = []
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.ws.recv())
+            kind = msg.WhichOneof("type")
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_kind = element.WhichOneof("type")
+                if element_kind == "exception":
+                    raise RuntimeError(f"{step}: {element.exception.message}")
+                proto = getattr(element, element_kind)
+                widget_id = getattr(proto, "id", "")
+                if widget_id:
+                    widgets.append((element_kind, getattr(proto, "label", ""), widget_id))
+            elif kind == "script_finished":
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue  # st.rerun(): server langsung menjalankan ulang, tunggu rerun berikutnya
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError(f"{step}: skrip gagal dikompilasi")
+                self.widgets = widgets
+                return
+
+
+async def run_session(url, session_id, chat_turns, timeout, repeat_questions, latencies):
+    """
+    Satu pengguna simulasi melewati alur nyata `main.main` -> `run_main_page`: render pertama,
+    isi dan kirim formulir, lalu beberapa giliran chat. Mengembalikan sesi yang masih terhubung
+    (ditutup pemanggil setelah memori server diukur).
+    """
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    rng = np.random.default_rng(session_id)
+    session = BrowserSession(url, timeout)
+    await session.connect()
+    try:
+        await session.rerun("initial", latencies)
+
+        # Nilai formulir berbeda per sesi agar cache per input tidak selalu kena
+        session.set_number("Usia", int(rng.integers(29, 78)))
+        session.set_number("Tekanan Darah", int(rng.integers(94, 200)))
+        session.set_number("Kolesterol", int(rng.integers(126, 564)))
+        session.set_number("Detak Jantung", int(rng.integers(71, 202)))
+        submit = WidgetState(id=session.widget_id("button", "Prediksi Sekarang"), trigger_value=True)
+        await session.rerun("submit", latencies, [submit])
+
+        for turn in range(chat_turns):
+            question = CHAT_QUESTIONS[turn % len(CHAT_QUESTIONS)]
+            if not repeat_questions:
+                # Pertanyaan unik per sesi agar cache balasan LLM tidak menyembunyikan latensi model
+                question = f"{question} (sesi {session_id}, giliran {turn + 1})"
+            chat = WidgetState(id=session.widget_id("chat_input"))
+            chat.chat_input_value.data = question
+            await session.rerun("chat", latencies, [chat])
+    except BaseException:
+        await session.close()
+        raise
+    return session
+
+
+async def _drive(url, pid, sessions, concurrency, chat_turns, timeout, repeat_questions):
+    latencies = []
+    errors = []
+    open_sessions = []
+    rss_samples = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(session_id):
+        async with limit:
+            try:
+                open_sessions.append(await run_session(url, session_id, chat_turns, timeout,
+                                                       repeat_questions, latencies))
+            except Exception as e:
+                errors.append(f"sesi {session_id}: {e or type(e).__name__}")
+
+    async def sample_rss():
+        while True:
+            rss_samples.append(_rss_mb(pid))
+            await asyncio.sleep(0.2)
+
+    # Pemanasan: modul, model, dan cache_resource dimuat sekali sebelum pengukuran (seperti server yang sudah jalan)
+    warmup = await run_session(url, sessions, 1, timeout, repeat_questions, [])
+    await warmup.close()
+    baseline_rss = _rss_mb(pid)
+
+    sampler = asyncio.create_task(sample_rss())
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one(session_id) for session_id in range(sessions)))
+    elapsed = time.perf_counter() - t_start
+    # Semua sesi yang selesai masih terhubung, sehingga session_state-nya masih ditahan server
+    after_rss = _rss_mb(pid)
+    sampler.cancel()
+    for session in open_sessions:
+        await session.close()
+    return latencies, errors, len(open_sessions), elapsed, baseline_rss, after_rss, rss_samples
+
+
+def run_app_load_test(sessions=20, concurrency=10, chat_turns=3, timeout=120.0, repeat_questions=False,
+                      first_token_latency=0.3, token_latency=0.02):
+    """
+    Menjalankan satu server `streamlit run main.py` headless dengan LLM tiruan dan cache LLM sementara,
+    lalu menjalankan `sessions` sesi websocket terhadap server itu, `concurrency` di antaranya bersamaan.
+    Semua sesi berbagi satu proses server (model, cache_resource, thread skrip, GIL), sehingga hasilnya
+    menggambarkan kapasitas satu server. Mengembalikan throughput, persentil latensi per jenis interaksi,
+    dan memori server (RSS) per sesi.
+    """
+    work_dir = tempfile.mkdtemp(prefix="app_loadgen_")
+    env = dict(os.environ)
+    env.update({
+        "USE_FAKE_LLM": "1",
+        "FAKE_LLM_FIRST_TOKEN_S": str(first_token_latency),
+        "FAKE_LLM_TOKEN_S": str(token_latency),
+        # Balasan LLM tiruan tidak boleh masuk ke cache bersama llm_cache.sqlite3
+        "LLM_CACHE_PATH": os.path.join(work_dir, "llm_cache.sqlite3"),
+        # Indeks kohort dibangun ulang saat pemanasan, tidak menyentuh cohort_cache milik aplikasi
+        "COHORT_CACHE_DIR": os.path.join(work_dir, "cohort_cache"),
+    })
+    port = _free_port()
+    log_path = os.path.join(work_dir, "server.log")
+    server = None
+    try:
+        with open(log_path, "wb") as log_file:
+            server = start_server(port, env, log_file)
+            try:
+                latencies, errors, completed, elapsed, baseline_rss, after_rss, rss_samples = asyncio.run(
+                    _drive(f"ws://127.0.0.1:{port}/_stcore/stream", server.pid, sessions, concurrency,
+                           chat_turns, timeout, repeat_questions))
+            except Exception as e:
+                with open(log_path, encoding="utf-8", errors="replace") as f:
+                    raise RuntimeError(f"{e}\nLog server:\n{f.read()[-2000:]}") from e
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    by_step = {}
+    for step, ms in latencies:
+        by_step.setdefault(step, []).append(ms)
+    latency_report = {}
+    for step, values in by_step.items():
+        values.sort()
+        latency_report[step] = {"count": len(values), "p50_ms": percentile(values, 50),
+                                "p90_ms": percentile(values, 90), "p99_ms": percentile(values, 99),
+                                "max_ms": values[-1]}
+
+    rss_known = baseline_rss is not None and after_rss is not None
+    return {
+        "sessions": sessions,
+        "completed_sessions": completed,
+        "concurrency": concurrency,
+        "chat_turns": chat_turns,
+        "errors": errors,
+        "seconds": elapsed,
+        "interactions_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "sessions_per_sec": completed / elapsed if elapsed > 0 else 0.0,
+        "latency": latency_report,
+        # RSS satu proses server: setelah pemanasan, tertinggi selama uji, dan setelah semua sesi selesai
+        # (masih terhubung). Selisihnya dibagi jumlah sesi = perkiraan memori per sesi.
+        "server_rss_mb": {
+            "baseline": baseline_rss,
+            "peak": max((v for v in rss_samples if v is not None), default=after_rss),
+            "after_sessions": after_rss,
+        },
+        "per_session_kb": (after_rss - baseline_rss) * 1024.0 / completed if rss_known and completed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban sesi bersamaan untuk satu server Streamlit (LLM tiruan).")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10, help="Jumlah sesi yang berjalan bersamaan.")
+    parser.add_argument("--chat-turns", type=int, default=3, help="Giliran chat per sesi setelah prediksi.")
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="Latensi LLM tiruan sebelum token pertama (detik).")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Latensi LLM tiruan per token berikutnya (detik).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Batas waktu satu rerun (detik).")
+    parser.add_argument("--repeat-questions", action="store_true", help="Pakai pertanyaan yang sama antar sesi (menguji cache LLM).")
+    parser.add_argument("--json", action="store_true", help="Cetak hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    report = run_app_load_test(args.sessions, args.concurrency, args.chat_turns, args.timeout, args.repeat_questions,
+                               args.first_token_latency, args.token_latency)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['completed_sessions']}/{report['sessions']} sesi selesai dalam {report['seconds']:.1f} detik "
+              f"({report['concurrency']} bersamaan, satu server): {report['interactions_per_sec']:.2f} interaksi/detik, "
+              f"{report['sessions_per_sec']:.2f} sesi/detik")
+        print(f"{'Interaksi':<12}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for step, stats in report["latency"].items():
+            print(f"{step:<12}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+                  f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+        rss = report["server_rss_mb"]
+        if report["per_session_kb"] is not None:
+            print(f"RSS server: {rss['baseline']:.1f} MB setelah pemanasan, puncak {rss['peak']:.1f} MB, "
+                  f"{rss['after_sessions']:.1f} MB dengan {report['completed_sessions']} sesi terhubung "
+                  f"(~{report['per_session_kb']:.0f} KB per sesi)")
+        for error in report["errors"]:
+            print(f"  GAGAL {error}", file=sys.stderr)
+    if report["errors"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
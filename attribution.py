@@ -0,0 +1,123 @@
+# attribution.py
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from risk_rules import CP_DESC, THAL_DESC
+from tracing import span
+
+FEATURE_LABELS = {
+    'age': 'Usia', 'sex': 'Jenis Kelamin', 'cp': 'Tipe Nyeri Dada', 'trestbps': 'Tekanan Darah Istirahat',
+    'chol': 'Kolesterol Serum', 'fbs': 'Gula Darah Puasa > 120 mg/dl', 'restecg': 'Hasil EKG Istirahat',
+    'thalach': 'Detak Jantung Maksimum', 'exang': 'Angina Akibat Olahraga', 'oldpeak': 'Depresi ST (oldpeak)',
+    'slope': 'Kemiringan Segmen ST', 'ca': 'Pembuluh Darah Utama Menyempit', 'thal': 'Tes Thallium',
+}
+FEATURE_UNITS = {'age': 'tahun', 'trestbps': 'mmHg', 'chol': 'mg/dl', 'thalach': 'bpm'}
+RESTECG_DESC = {0: 'Normal', 1: 'ST-T Wave Abnormality', 2: 'Probable or Definite LVH'}
+SLOPE_DESC = {1: 'Upsloping', 2: 'Flat', 3: 'Downsloping'}
+
+# Kontribusi minimum (log-odds) agar sebuah fitur dianggap menonjol
+MIN_CONTRIBUTION = 0.05
+
+
+def _iteration_range(model):
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        best_iteration = None
+    return (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+
+
+def score_with_attribution(model, scaler, feature_names, df):
+    """
+    Probabilitas dan kontribusi per fitur dalam satu penelusuran booster (atribusi jalur ala Saabas,
+    biayanya setara prediksi biasa). Kontribusi dalam satuan log-odds; jumlahnya ditambah bias sama
+    dengan margin model. Mengembalikan (prediction, prediction_proba, contributions DataFrame).
+    Untuk model terkompilasi lama tanpa `node_mean`, hanya probabilitas yang dihitung dan
+    `contributions` bernilai None.
+    """
+    features = df[feature_names]
+    if hasattr(model, 'predict_contributions') and getattr(model, 'node_mean', None) is None:
+        with span("predict"):
+            prediction_proba = model.predict_proba(features)
+        return (prediction_proba[:, 1] > 0.5).astype(int), prediction_proba, None
+    if hasattr(model, 'predict_contributions'):
+        # CompiledEnsemble / bundle: menerima nilai mentah, scaler sudah termasuk di model
+        with span("predict"):
+            margin, contributions, _ = model.predict_contributions(features)
+    else:
+        from xgboost import DMatrix
+
+        with span("scale"):
+            scaled = pd.DataFrame(scaler.transform(features), columns=feature_names, index=features.index)
+        with span("predict"):
+            output = model.get_booster().predict(
+                DMatrix(scaled), pred_contribs=True, approx_contribs=True,
+                iteration_range=_iteration_range(model),
+            )
+        margin = output.sum(axis=1)
+        contributions = output[:, :-1]
+
+    p = 1.0 / (1.0 + np.exp(-margin))
+    prediction_proba = np.column_stack([1.0 - p, p])
+    prediction = (p > 0.5).astype(int)
+    return prediction, prediction_proba, pd.DataFrame(contributions, columns=feature_names, index=features.index)
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def explain_patient(_model, _scaler, feature_names, patient, model_key):
+    """
+    Versi satu pasien dari `score_with_attribution`, di-cache per input. `patient` berupa tuple nilai
+    fitur; `model_key` (versi dari `klasifikasi.get_model_and_version()`) membedakan model, mis. setelah bundle baru dimuat.
+    """
+    df = pd.DataFrame([patient], columns=feature_names)
+    return score_with_attribution(_model, _scaler, list(feature_names), df)
+
+
+def describe_value(feature, value):
+    """Nilai fitur dalam bentuk yang mudah dibaca untuk ditampilkan ke pengguna."""
+    if pd.isna(value):
+        return "tidak diisi"
+    if feature == 'sex':
+        return 'Pria' if value == 1 else 'Wanita'
+    if feature in ('fbs', 'exang'):
+        return 'Ya' if value == 1 else 'Tidak'
+    if feature == 'cp':
+        return CP_DESC.get(int(value), f"{value:g}")
+    if feature == 'restecg':
+        return RESTECG_DESC.get(int(value), f"{value:g}")
+    if feature == 'slope':
+        return SLOPE_DESC.get(int(value), f"{value:g}")
+    if feature == 'thal':
+        return f"{value:g}, {THAL_DESC.get(float(value), 'N/A')}"
+    unit = FEATURE_UNITS.get(feature)
+    return f"{value:g} {unit}" if unit else f"{value:g}"
+
+
+def risk_factor_texts(row, contributions, top_n=5, min_contribution=MIN_CONTRIBUTION):
+    """
+    Daftar fitur yang paling menaikkan risiko menurut model untuk satu pasien, dengan markup tebal
+    seperti daftar saran sebelumnya. `row` dan `contributions` berupa Series berindeks nama fitur.
+    """
+    top = contributions[contributions >= min_contribution].sort_values(ascending=False).head(top_n)
+    return [
+        f"**{FEATURE_LABELS.get(feature, feature)}** ({describe_value(feature, row[feature])}) "
+        f"menaikkan risiko menurut model (kontribusi +{value:.2f})."
+        for feature, value in top.items()
+    ]
+
+
+def top_factor_labels(contributions, k=3, min_contribution=MIN_CONTRIBUTION, sep="; "):
+    """Untuk banyak pasien sekaligus: nama `k` fitur teratas yang menaikkan risiko, per baris."""
+    values = contributions.to_numpy()
+    labels = np.array([FEATURE_LABELS.get(f, f) for f in contributions.columns], dtype=object)
+    order = np.argsort(-values, axis=1)[:, :k]
+    top_values = np.take_along_axis(values, order, axis=1)
+    joined = pd.Series("", index=contributions.index, dtype=object)
+    for j in range(order.shape[1]):
+        text = pd.Series(np.where(top_values[:, j] >= min_contribution, labels[order[:, j]], ""),
+                         index=contributions.index, dtype=object)
+        prefix = pd.Series(np.where((text != "") & (joined != ""), sep, ""), index=contributions.index, dtype=object)
+        joined = joined + prefix + text
+    return joined
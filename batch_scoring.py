@@ -0,0 +1,187 @@
+# batch_scoring.py
+
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import streamlit as st
+
+from attribution import score_with_attribution, top_factor_labels
+from klasifikasi import get_model_and_scaler
+from risk_rules import evaluate_risk_rules, join_saran
+from tracing import span
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def score_frame(model, scaler, feature_names, df):
+    """
+    Menskalakan dan memprediksi banyak pasien sekaligus: satu kali `scaler.transform` dan satu kali
+    `predict_proba`. Label prediksi diturunkan dari probabilitas (> 0.5) seperti yang dilakukan
+    `XGBClassifier.predict`, sehingga tidak perlu pemanggilan model kedua.
+    Jika `scaler` adalah None, model dianggap sudah memuat scaler (mis. `CompiledEnsemble`); evaluator
+    NumPy itu beberapa kali lebih lambat dari xgboost untuk ribuan baris (lihat `klasifikasi.py`).
+    """
+    features = df[feature_names]
+    with span("scale"):
+        if scaler is None:
+            scaled = features
+        else:
+            scaled = pd.DataFrame(scaler.transform(features), columns=feature_names, index=features.index)
+    with span("predict"):
+        prediction_proba = model.predict_proba(scaled)
+    prediction = (prediction_proba[:, 1] > 0.5).astype(int)
+    return prediction, prediction_proba
+
+
+def _iter_xlsx_chunks(source, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNK_SIZE, file_name=None):
+    """
+    Membaca file kohort (CSV atau XLSX) per potongan `chunksize` baris agar memori tetap terbatas
+    berapa pun jumlah baris di dalam file. Potongan kosong (mis. CSV yang hanya berisi header) tidak
+    dikembalikan, sama seperti jalur XLSX.
+    """
+    name = (file_name or getattr(source, 'name', None) or str(source)).lower()
+    if name.endswith(('.xlsx', '.xlsm')):
+        yield from _iter_xlsx_chunks(source, chunksize)
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            if chunk.empty:
+                continue
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            yield chunk
+
+
+def score_chunk(model, scaler, feature_names, chunk):
+    """
+    Menambahkan kolom probabilitas, prediksi, dan faktor risiko ke satu potongan data. Kontribusi per
+    fitur dihitung bersama probabilitas dalam satu penelusuran model (`faktor_model`).
+    """
+    missing = [f for f in feature_names if f not in chunk.columns]
+    if missing:
+        raise ValueError(f"Kolom berikut tidak ditemukan di file: {', '.join(missing)}")
+
+    chunk = chunk.copy()
+    chunk[feature_names] = chunk[feature_names].apply(pd.to_numeric, errors='coerce')
+    prediction, prediction_proba, contributions = score_with_attribution(model, scaler, feature_names, chunk)
+    chunk['probabilitas'] = prediction_proba[:, 1].round(4)
+    chunk['prediksi'] = prediction
+    chunk['hasil_prediksi'] = pd.Series(prediction, index=chunk.index).map(
+        {1: 'Risiko Tinggi', 0: 'Risiko Rendah'}
+    )
+    chunk['faktor_model'] = top_factor_labels(contributions) if contributions is not None else ""
+    chunk['faktor_risiko'] = join_saran(evaluate_risk_rules(chunk))
+    return chunk
+
+
+def score_file(model, scaler, feature_names, source, output_path, chunksize=DEFAULT_CHUNK_SIZE,
+               file_name=None, progress_callback=None):
+    """
+    Menilai seluruh isi file kohort dan menulis hasilnya ke `output_path` (CSV) secara bertahap.
+    Jika `output_path` berakhiran `.gz`, hasil ditulis terkompresi gzip. Mengembalikan ringkasan: jumlah baris, jumlah risiko tinggi, durasi, dan throughput (baris/detik).
+    """
+    total_rows = 0
+    high_risk = 0
+    start = time.perf_counter()
+    opener = gzip.open if str(output_path).endswith('.gz') else open
+    with opener(output_path, 'wt', newline='', encoding='utf-8') as out:
+        for i, chunk in enumerate(iter_chunks(source, chunksize, file_name=file_name)):
+            scored = score_chunk(model, scaler, feature_names, chunk)
+            scored.to_csv(out, index=False, header=(i == 0))
+            total_rows += len(scored)
+            high_risk += int(scored['prediksi'].sum())
+            if progress_callback:
+                progress_callback(total_rows)
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": total_rows,
+        "high_risk": high_risk,
+        "seconds": elapsed,
+        "rows_per_sec": total_rows / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def run_batch_page(feature_names):
+    """Bagian antarmuka untuk skrining kohort: unggah CSV/XLSX, nilai semua pasien, unduh hasilnya."""
+    st.markdown("---")
+    with st.expander("📁 Skrining Kohort (Banyak Pasien Sekaligus)"):
+        st.markdown(
+            "Unggah file CSV/XLSX dengan kolom yang sama seperti data latih "
+            f"(`{', '.join(feature_names)}`). Setiap baris akan dinilai dan hasilnya dapat diunduh."
+        )
+        uploaded = st.file_uploader("Pilih file kohort", type=["csv", "xlsx"], key="batch_upload")
+        if uploaded is None or not st.button("Nilai Kohort", key="batch_run"):
+            return
+
+        model, scaler = get_model_and_scaler()
+        if model is None:
+            st.error("Skrining tidak dapat dilakukan karena model atau scaler gagal dimuat.")
+            return
+
+        # Hasil ditulis terkompresi (beberapa kali lebih kecil dari CSV biasa) karena tombol unduh
+        # Streamlit menyimpan isi file di memori; file sementara selalu dihapus setelah dibaca.
+        with tempfile.NamedTemporaryFile(prefix="hasil_kohort_", suffix=".csv.gz", delete=False) as tmp:
+            output_path = tmp.name
+        status = st.empty()
+        try:
+            try:
+                summary = score_file(
+                    model, scaler, feature_names, uploaded, output_path, file_name=uploaded.name,
+                    progress_callback=lambda n: status.markdown(f"Memproses... **{n:,}** baris selesai dinilai."),
+                )
+            except ValueError as e:
+                st.error(f"Gagal menilai file: {e}")
+                return
+            with open(output_path, 'rb') as f:
+                result = f.read()
+        finally:
+            os.unlink(output_path)
+
+        status.success(
+            f"Selesai menilai **{summary['rows']:,}** pasien "
+            f"({summary['high_risk']:,} risiko tinggi) dalam {summary['seconds']:.2f} detik "
+            f"— **{summary['rows_per_sec']:,.0f} baris/detik**."
+        )
+        st.download_button(
+            f"Unduh Hasil (CSV.GZ, {len(result) / 1e6:.1f} MB)", result,
+            file_name=f"hasil_{os.path.splitext(uploaded.name)[0]}.csv.gz",
+            mime="application/gzip", key="batch_download",
+        )
+
+
+if __name__ == '__main__':
+    # Penggunaan: python batch_scoring.py <input.csv|input.xlsx> <output.csv[.gz]> [chunksize]
+    from klasifikasi import load_model_and_metadata
+
+    if len(sys.argv) < 3:
+        print("Penggunaan: python batch_scoring.py <input.csv|input.xlsx> <output.csv> [chunksize]")
+        sys.exit(1)
+    model, scaler, feature_names, _ = load_model_and_metadata()
+    if model is None:
+        sys.exit(1)
+    chunksize = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CHUNK_SIZE
+    summary = score_file(model, scaler, feature_names, sys.argv[1], sys.argv[2], chunksize=chunksize,
+                         progress_callback=lambda n: print(f"\r{n:,} baris", end="", flush=True))
+    print(f"\n{summary['rows']:,} baris dinilai dalam {summary['seconds']:.2f} detik "
+          f"({summary['rows_per_sec']:,.0f} baris/detik), {summary['high_risk']:,} risiko tinggi.")
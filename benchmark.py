@@ -0,0 +1,193 @@
+# benchmark.py
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = 'heart_disease_data.xlsx'
+BATCH_SIZES = [1, 64, 4096, 1_000_000]
+
+# Kasus dengan satuan throughput: makin besar makin baik. Sisanya dalam ms: makin kecil makin baik.
+HIGHER_IS_BETTER = ("rows_per_sec",)
+
+
+def make_batch(seed_df, n_rows, seed=0):
+    """Mengambil sampel (dengan pengembalian) dari data referensi agar distribusinya realistis."""
+    rng = np.random.default_rng(seed)
+    return seed_df.iloc[rng.integers(0, len(seed_df), size=n_rows)].reset_index(drop=True)
+
+
+def _timeit(fn, repeat, min_seconds=0.2):
+    """Median durasi (detik) dari `repeat` kali pemanggilan, minimal selama `min_seconds` total."""
+    fn()  # pemanasan
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - start < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+        if len(timings) >= 10_000:
+            break
+    return statistics.median(timings)
+
+
+def bench_cold_load(repeat=3):
+    """Waktu memuat model + scaler pada proses Python baru (termasuk impor xgboost/sklearn)."""
+    code = (
+        "import time; t0 = time.perf_counter(); "
+        "from klasifikasi import _load_pickles; m, s, _, e = _load_pickles(); "
+        "print(-1 if e else time.perf_counter() - t0)"
+    )
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        seconds = float(out.stdout.strip().splitlines()[-1])
+        if seconds < 0:
+            raise RuntimeError("Model atau scaler gagal dimuat.")
+        timings.append(seconds)
+    return {"ms": statistics.median(timings) * 1000.0}
+
+
+def bench_scoring(model, scaler, feature_names, seed_df, batch_sizes, label="xgboost"):
+    from batch_scoring import score_frame
+
+    results = {}
+    for n in batch_sizes:
+        batch = make_batch(seed_df, n)
+        seconds = _timeit(lambda: score_frame(model, scaler, feature_names, batch), repeat=3 if n >= 100_000 else 20)
+        results[f"score_{label}_{n}"] = {"ms": seconds * 1000.0, "rows_per_sec": n / seconds}
+    return results
+
+
+def bench_risk_rules(seed_df, batch_sizes):
+    from risk_rules import evaluate_risk_rules, join_saran
+
+    results = {}
+    for n in batch_sizes:
+        batch = make_batch(seed_df, n)
+        seconds = _timeit(lambda: join_saran(evaluate_risk_rules(batch)), repeat=3 if n >= 100_000 else 20)
+        results[f"risk_rules_{n}"] = {"ms": seconds * 1000.0, "rows_per_sec": n / seconds}
+    return results
+
+
+def bench_chat():
+    """Format prompt kontekstual + pemanggilan LLM tiruan tanpa latensi (biaya lokal saja)."""
+    from langchain_core.prompts import PromptTemplate
+
+    from fake_llm import FakeStreamingChatModel
+    from main_page import contextual_prompt_template, stream_chat_response
+
+    prompt = PromptTemplate(input_variables=["analysis_result", "chat_history", "question"],
+                            template=contextual_prompt_template)
+    chat_model = FakeStreamingChatModel(first_token_latency=0.0, token_latency=0.0)
+    context = "Hasil Prediksi: Risiko Tinggi Penyakit Jantung\n\nProbabilitas: 87.00%\n\n"
+
+    format_s = _timeit(lambda: prompt.format(analysis_result=context, chat_history="",
+                                             question="Apa itu kolesterol tinggi?"), repeat=200)
+
+    def round_trip():
+        text = prompt.format(analysis_result=context, chat_history="", question="Makanan apa yang baik untuk jantung?")
+        return "".join(stream_chat_response(chat_model, text, {}))
+
+    round_trip_s = _timeit(round_trip, repeat=100)
+    return {"prompt_format": {"ms": format_s * 1000.0}, "chat_stub_round_trip": {"ms": round_trip_s * 1000.0}}
+
+
+def run_benchmarks(batch_sizes=BATCH_SIZES, include_chat=True, include_cold=True):
+    from klasifikasi import load_model_and_metadata
+
+    model, scaler, feature_names, _ = load_model_and_metadata()
+    if model is None:
+        raise SystemExit("Benchmark tidak dapat dijalankan karena model atau scaler gagal dimuat.")
+    seed_df = pd.read_excel(DATA_PATH)[feature_names].dropna()
+
+    results = {}
+    if include_cold:
+        results["cold_load"] = bench_cold_load()
+    # Tanpa scaler berarti model berasal dari bundle ter-mmap (scaler sudah termasuk di model)
+    results.update(bench_scoring(model, scaler, feature_names, seed_df, batch_sizes,
+                                 label="xgboost" if scaler is not None else "bundle"))
+    if os.path.exists('xgb_compiled.npz'):
+        from compiled_model import CompiledEnsemble
+
+        compiled = CompiledEnsemble.load('xgb_compiled.npz')
+        results.update(bench_scoring(compiled, None, feature_names, seed_df, batch_sizes, label="compiled"))
+    results.update(bench_risk_rules(seed_df, batch_sizes))
+    if include_chat:
+        results.update(bench_chat())
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Mengembalikan daftar regresi: kasus yang lebih buruk dari baseline melebihi `tolerance` (rasio)."""
+    regressions = []
+    for case, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(case)
+        if not base:
+            continue
+        for key, value in metrics.items():
+            if key not in base or base[key] <= 0:
+                continue
+            if key in HIGHER_IS_BETTER:
+                change = (base[key] - value) / base[key]
+            else:
+                change = (value - base[key]) / base[key]
+            if change > tolerance:
+                regressions.append(f"{case}.{key}: {base[key]:.4g} -> {value:.4g} ({change:+.0%} lebih buruk)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur inferensi dan chat.")
+    parser.add_argument("--output", default="benchmark_results.json", help="File hasil (JSON).")
+    parser.add_argument("--baseline", help="Bandingkan dengan hasil tersimpan; exit 1 jika ada regresi.")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Simpan hasil sebagai baseline baru.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Toleransi regresi (0.25 = 25%%).")
+    parser.add_argument("--quick", action="store_true", help="Lewati batch 1 juta baris dan cold load.")
+    parser.add_argument("--no-chat", action="store_true", help="Lewati benchmark chat (tanpa langchain).")
+    args = parser.parse_args()
+
+    batch_sizes = [n for n in BATCH_SIZES if n < 1_000_000] if args.quick else BATCH_SIZES
+    report = run_benchmarks(batch_sizes, include_chat=not args.no_chat, include_cold=not args.quick)
+
+    print(f"{'Kasus':<32}{'ms':>12}{'baris/detik':>16}")
+    for case, metrics in report["results"].items():
+        rows_per_sec = f"{metrics['rows_per_sec']:,.0f}" if "rows_per_sec" in metrics else "-"
+        print(f"{case:<32}{metrics['ms']:>12.3f}{rows_per_sec:>16}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESI TERDETEKSI:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nTidak ada regresi melebihi {args.tolerance:.0%} dibanding baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# chat_memory.py
+
+import re
+from collections import deque
+
+ROLE_LABELS = {"human": "Pengguna", "ai": "Asisten"}
+
+
+def estimate_tokens(text):
+    """Perkiraan kasar jumlah token (~4 karakter per token) tanpa memuat tokenizer."""
+    return len(text) // 4 + 1 if text else 0
+
+
+def _first_sentence(text, max_chars=200):
+    text = re.sub(r"\s+", " ", text.replace("**", "")).strip()
+    match = re.search(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rstrip() + "…"
+
+
+def extractive_summarizer(previous_summary, role, content, budget_tokens):
+    """
+    Memperbarui ringkasan secara inkremental: satu baris per giliran yang dilipat (kalimat pertama saja).
+    Jika melebihi `budget_tokens`, baris tertua dibuang. Tidak memanggil LLM, sehingga biayanya tetap.
+    """
+    lines = previous_summary.split("\n") if previous_summary else []
+    lines.append(f"{ROLE_LABELS.get(role, role)}: {_first_sentence(content)}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ChatMemory:
+    """
+    Memori percakapan terbatas: `max_recent` giliran terakhir disimpan apa adanya sebagai tuple
+    (role, content); giliran yang lebih lama dilipat satu per satu ke ringkasan berjalan.
+    Ukuran memori per sesi tetap konstan berapa pun panjang percakapannya.
+    """
+
+    __slots__ = ("recent", "summary", "folded_turns", "max_recent", "summary_budget_tokens", "summarizer")
+
+    def __init__(self, first_message=None, max_recent=8, summary_budget_tokens=300, summarizer=None):
+        self.recent = deque()
+        self.summary = ""
+        self.folded_turns = 0
+        self.max_recent = max_recent
+        self.summary_budget_tokens = summary_budget_tokens
+        self.summarizer = summarizer or extractive_summarizer
+        if first_message:
+            self.add("ai", first_message)
+
+    def add(self, role, content):
+        self.recent.append((role, content))
+        while len(self.recent) > self.max_recent:
+            old_role, old_content = self.recent.popleft()
+            self.summary = self.summarizer(self.summary, old_role, old_content, self.summary_budget_tokens)
+            self.folded_turns += 1
+
+    def messages(self):
+        return list(self.recent)
+
+    def render_history(self, budget_tokens):
+        """
+        Teks riwayat untuk prompt dalam batas `budget_tokens`: ringkasan (jika ada) lalu giliran terbaru.
+        Giliran paling lama dibuang lebih dulu bila anggaran tidak cukup.
+        """
+        if budget_tokens <= 0:
+            return ""
+        summary_block = f"Ringkasan percakapan sebelumnya:\n{self.summary}" if self.summary else ""
+        remaining = budget_tokens - estimate_tokens(summary_block)
+        if remaining < 0:
+            # Ringkasan saja sudah melebihi anggaran: potong dari depan
+            return summary_block[-budget_tokens * 4:]
+
+        lines = []
+        for role, content in reversed(self.recent):
+            line = f"{ROLE_LABELS.get(role, role)}: {content}"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            lines.append(line)
+            remaining -= cost
+        lines.reverse()
+        return "\n\n".join(part for part in (summary_block, "\n".join(lines)) if part)
@@ -0,0 +1,302 @@
+# cohort_index.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from batch_scoring import iter_chunks, score_frame
+from klasifikasi import get_model_and_version
+
+DATA_PATH = 'heart_disease_data.xlsx'
+COHORT_CACHE_DIR = os.getenv("COHORT_CACHE_DIR", "cohort_cache")
+CACHE_FORMAT_VERSION = 1
+
+# Strata usia x jenis kelamin. Kode strata = pita_usia * 2 + sex; baris tanpa usia/jenis kelamin
+# masuk ke strata tambahan terakhir (hanya ikut dihitung pada perbandingan keseluruhan).
+AGE_EDGES = (40, 50, 60, 70)
+N_STRATA = (len(AGE_EDGES) + 1) * 2
+COHORT_METRICS = {
+    'trestbps': ("Tekanan Darah Istirahat", "mmHg"),
+    'chol': ("Kolesterol Serum", "mg/dl"),
+    'thalach': ("Detak Jantung Maks.", "bpm"),
+    'oldpeak': ("Depresi ST (oldpeak)", ""),
+}
+SCORE_BLOCK = 200_000
+
+_build_lock = threading.Lock()
+
+
+def stratum_codes(age, sex):
+    """Kode strata untuk array usia dan jenis kelamin (1 = pria, 0 = wanita)."""
+    age = np.asarray(age, dtype=float)
+    sex = np.asarray(sex, dtype=float)
+    codes = np.digitize(age, AGE_EDGES) * 2 + np.nan_to_num(sex).astype(np.int64)
+    invalid = np.isnan(age) | ~np.isin(sex, (0, 1))
+    return np.where(invalid, N_STRATA, codes).astype(np.int16)
+
+
+def stratum_label(code):
+    band, sex = divmod(int(code), 2)
+    lo = AGE_EDGES[band - 1] if band > 0 else None
+    hi = AGE_EDGES[band] - 1 if band < len(AGE_EDGES) else None
+    if lo is None:
+        ages = f"< {hi + 1} tahun"
+    elif hi is None:
+        ages = f"≥ {lo} tahun"
+    else:
+        ages = f"{lo}–{hi} tahun"
+    return f"{'Pria' if sex == 1 else 'Wanita'} {ages}"
+
+
+def _sorted_index(values, strata):
+    """
+    Indeks terurut untuk satu kolom: seluruh nilai terurut, nilai terurut per strata (bersebelahan),
+    dan offset awal tiap strata. Nilai kosong (NaN) diabaikan.
+    """
+    valid = ~np.isnan(values)
+    values, strata = values[valid], strata[valid]
+    order = np.lexsort((values, strata))
+    offsets = np.searchsorted(strata[order], np.arange(N_STRATA + 2)).astype(np.int64)
+    return np.sort(values), values[order], offsets
+
+
+def _save_atomic(path, array):
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _save_index(cache_dir, name, values, strata):
+    all_sorted, by_stratum, offsets = _sorted_index(values, strata)
+    # File "all" ditulis terakhir: keberadaannya menandakan indeks lengkap
+    _save_atomic(os.path.join(cache_dir, f"strata_{name}.npy"), by_stratum)
+    _save_atomic(os.path.join(cache_dir, f"offsets_{name}.npy"), offsets)
+    _save_atomic(os.path.join(cache_dir, f"all_{name}.npy"), all_sorted)
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def _count_rows(source, feature_names, file_name=None):
+    """Lintasan pertama: memeriksa kolom dan menghitung jumlah baris tanpa menyimpan datanya."""
+    rows = 0
+    for chunk in iter_chunks(source, file_name=file_name):
+        missing = [f for f in feature_names if f not in chunk.columns]
+        if missing:
+            raise ValueError(f"Kolom berikut tidak ditemukan di file: {', '.join(missing)}")
+        rows += len(chunk)
+    return rows
+
+
+def _write_columns(source, out_dir, feature_names, rows, file_name=None):
+    """
+    Lintasan kedua: setiap potongan langsung ditulis ke file .npy per kolom (memmap berukuran tetap),
+    sehingga memori puncak sebatas satu potongan, bukan seluruh kolom ditambah salinan gabungannya.
+    """
+    columns = {name: np.lib.format.open_memmap(os.path.join(out_dir, f"col_{name}.npy"), mode='w+',
+                                               dtype=float, shape=(rows,))
+               for name in feature_names}
+    strata = np.lib.format.open_memmap(os.path.join(out_dir, "strata.npy"), mode='w+', dtype=np.int16, shape=(rows,))
+    start = 0
+    for chunk in iter_chunks(source, file_name=file_name):
+        stop = start + len(chunk)
+        if stop > rows:
+            raise ValueError("Isi file berubah selama indeks kohort dibuat.")
+        for name in feature_names:
+            columns[name][start:stop] = pd.to_numeric(chunk[name], errors='coerce').to_numpy(dtype=float)
+        strata[start:stop] = stratum_codes(columns['age'][start:stop], columns['sex'][start:stop])
+        start = stop
+    if start != rows:
+        raise ValueError("Isi file berubah selama indeks kohort dibuat.")
+    for array in (*columns.values(), strata):
+        array.flush()
+
+
+def build_cohort_cache(source, cache_dir, feature_names, file_name=None):
+    """
+    Mengonversi file kohort (CSV/XLSX) sekali saja ke format kolumnar: satu file .npy per fitur
+    ditambah indeks terurut per strata untuk setiap metrik. File dibaca dua kali (hitung baris, lalu
+    tulis per potongan) agar memori tetap terbatas. Ditulis ke direktori sementara lalu di-rename,
+    sehingga proses lain tidak pernah melihat cache setengah jadi.
+    """
+    rows = _count_rows(source, feature_names, file_name=file_name)
+
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        _rewind(source)
+        _write_columns(source, tmp_dir, feature_names, rows, file_name=file_name)
+        strata = np.load(os.path.join(tmp_dir, "strata.npy"), mmap_mode='r')
+        for name in COHORT_METRICS:
+            values = np.load(os.path.join(tmp_dir, f"col_{name}.npy"), mmap_mode='r')
+            _save_index(tmp_dir, name, values, strata)
+        del strata, values
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"format_version": CACHE_FORMAT_VERSION, "rows": int(rows),
+                       "feature_names": list(feature_names), "age_edges": list(AGE_EDGES),
+                       "source": file_name or str(source)}, f)
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        # Proses lain sudah lebih dulu menulis cache yang sama
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(cache_dir, "meta.json")):
+            raise
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+class CohortIndex:
+    """
+    Kohort referensi yang sudah diindeks. Array dibuka sebagai memmap read-only, dan setiap
+    pencarian persentil hanya berupa dua `np.searchsorted` pada potongan terurut (O(log n)).
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self._arrays = {}
+
+    def _array(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.cache_dir, f"{name}.npy"), mmap_mode='r')
+            self._arrays[name] = array
+        return array
+
+    def has_index(self, name):
+        return os.path.exists(os.path.join(self.cache_dir, f"all_{name}.npy"))
+
+    def percentile(self, name, value, stratum=None):
+        """Persentil (0-100, mid-rank) `value` terhadap kohort atau satu strata. Mengembalikan (persentil, n)."""
+        if stratum is None:
+            values = self._array(f"all_{name}")
+        else:
+            offsets = self._array(f"offsets_{name}")
+            values = self._array(f"strata_{name}")[offsets[stratum]:offsets[stratum + 1]]
+        n = len(values)
+        if n == 0:
+            return float('nan'), 0
+        below = np.searchsorted(values, value, side='left')
+        below_or_equal = np.searchsorted(values, value, side='right')
+        return 100.0 * (below + below_or_equal) / (2.0 * n), n
+
+    def ensure_probability_index(self, model, scaler, model_tag):
+        """
+        Probabilitas model untuk seluruh kohort, dihitung sekali per versi model dari kolom yang sudah
+        tersimpan (file asli tidak dibaca ulang). Mengembalikan nama indeksnya.
+        """
+        name = f"proba-{model_tag}"
+        if self.has_index(name):
+            return name
+        with _build_lock:
+            # Sesi lain mungkin sudah selesai membangun indeks ini selama kita menunggu kunci
+            if not self.has_index(name):
+                self._build_probability_index(name, model, scaler)
+        return name
+
+    def _build_probability_index(self, name, model, scaler):
+        feature_names = self.meta["feature_names"]
+        columns = [self._array(f"col_{f}") for f in feature_names]
+        proba = np.empty(self.rows)
+        for start in range(0, self.rows, SCORE_BLOCK):
+            block = pd.DataFrame({f: np.asarray(c[start:start + SCORE_BLOCK]) for f, c in zip(feature_names, columns)})
+            proba[start:start + len(block)] = score_frame(model, scaler, feature_names, block)[1][:, 1]
+        _save_index(self.cache_dir, name, proba, np.asarray(self._array("strata")))
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:20]
+
+
+def _open_or_build(cache_dir, source, feature_names, file_name=None):
+    with _build_lock:
+        if not os.path.exists(os.path.join(cache_dir, "meta.json")):
+            os.makedirs(os.path.dirname(cache_dir) or ".", exist_ok=True)
+            build_cohort_cache(source, cache_dir, feature_names, file_name=file_name)
+    return CohortIndex(cache_dir)
+
+
+@st.cache_resource(show_spinner="Menyiapkan indeks kohort referensi...")
+def load_reference_cohort(path, signature, feature_names):
+    """Kohort dari file lokal; `signature` (ukuran, mtime) membuat cache baru jika file berubah."""
+    cache_dir = os.path.join(COHORT_CACHE_DIR, _digest(f"v{CACHE_FORMAT_VERSION}|{os.path.abspath(path)}|{signature}"))
+    return _open_or_build(cache_dir, path, list(feature_names))
+
+
+@st.cache_resource(show_spinner="Menyiapkan indeks kohort yang diunggah...")
+def load_uploaded_cohort(content_digest, _data, file_name, feature_names):
+    """Kohort dari file yang diunggah, di-cache menurut isi file (bukan namanya)."""
+    import io
+
+    cache_dir = os.path.join(COHORT_CACHE_DIR, _digest(f"v{CACHE_FORMAT_VERSION}|upload|{content_digest}"))
+    return _open_or_build(cache_dir, io.BytesIO(_data), list(feature_names), file_name=file_name)
+
+
+def reference_cohort(feature_names, path=DATA_PATH):
+    stat = os.stat(path)
+    return load_reference_cohort(path, (stat.st_size, stat.st_mtime_ns), tuple(feature_names))
+
+
+def compare_patient(index, patient, probability=None, proba_index=None):
+    """Tabel posisi pasien (persentil) terhadap seluruh kohort dan strata usia/jenis kelaminnya."""
+    stratum = int(stratum_codes([patient['age']], [patient['sex']])[0])
+    group = stratum_label(stratum) if stratum < N_STRATA else "Kelompok"
+    items = [(label, f"{patient[name]:g} {unit}".strip(), name, patient[name])
+             for name, (label, unit) in COHORT_METRICS.items()]
+    if probability is not None and proba_index is not None:
+        items.append(("Probabilitas Risiko (model)", f"{probability:.1%}", proba_index, probability))
+
+    rows = []
+    for label, shown, name, value in items:
+        overall, n_overall = index.percentile(name, value)
+        in_group, n_group = index.percentile(name, value, stratum) if stratum < N_STRATA else (float('nan'), 0)
+        rows.append({
+            "Metrik": label,
+            "Nilai Anda": shown,
+            "Persentil (semua)": f"{overall:.0f} (n={n_overall:,})" if n_overall else "-",
+            f"Persentil ({group})": f"{in_group:.0f} (n={n_group:,})" if n_group else "-",
+        })
+    return pd.DataFrame(rows)
+
+
+def render_cohort_comparison(feature_names):
+    """Bagian 'Visualisasi Input': posisi nilai pasien dibandingkan populasi referensi."""
+    user_df = st.session_state.get("user_df")
+    if user_df is None:
+        return
+
+    st.markdown("##### Posisi Anda Dibandingkan Populasi Referensi:")
+    uploaded = st.file_uploader("Kohort referensi lain (opsional, CSV/XLSX)", type=["csv", "xlsx"], key="cohort_upload")
+    try:
+        if uploaded is not None:
+            data = uploaded.getvalue()
+            index = load_uploaded_cohort(hashlib.sha256(data).hexdigest(), data, uploaded.name, tuple(feature_names))
+            source = uploaded.name
+        else:
+            index = reference_cohort(feature_names)
+            source = os.path.basename(DATA_PATH)
+    except (OSError, ValueError) as e:
+        st.error(f"Kohort referensi tidak dapat dimuat. Error: {e}")
+        return
+
+    proba_index = None
+    model, scaler, version = get_model_and_version()
+    if model is not None:
+        proba_index = index.ensure_probability_index(model, scaler, version)
+
+    patient = user_df.iloc[0]
+    probability = st.session_state.prediction_proba[0][1]
+    st.dataframe(compare_patient(index, patient, probability, proba_index), hide_index=True, use_container_width=True)
+    st.caption(f"Persentil 80 berarti nilai Anda lebih tinggi dari sekitar 80% orang pada kohort '{source}' "
+               f"({index.rows:,} baris). Kolom kanan hanya membandingkan dengan orang seusia dan sejenis kelamin.")
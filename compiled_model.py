@@ -0,0 +1,303 @@
+# compiled_model.py
+
+import json
+import sys
+
+import numpy as np
+
+COMPILED_MODEL_PATH = 'xgb_compiled.npz'
+
+# Jumlah baris per blok penelusuran; array sementara berukuran (baris x pohon)
+ROW_BLOCK = 8192
+
+
+class CompiledEnsemble:
+    """
+    Ensemble pohon XGBoost dalam bentuk array NumPy datar. Affine map dari MinMaxScaler (`scale`,
+    `offset`, `clip_range`) ikut disimpan, sehingga model ini menerima nilai klinis mentah (tanpa
+    scaler) dan tidak membutuhkan xgboost saat inferensi.
+
+    Perbandingan split dilakukan persis seperti XGBoost: nilai diskalakan dalam float64 seperti
+    `MinMaxScaler.transform`, dibulatkan ke float32, lalu dibandingkan dengan threshold float32.
+    Threshold tidak dilipat ke nilai mentah karena cut `hist`/`approx` jatuh tepat pada nilai
+    teramati dan pelipatan dalam float64 mengubah arah baris yang tepat berada di cut tersebut.
+
+    Daun disimpan sebagai node yang menunjuk ke dirinya sendiri, sehingga penelusuran cukup dilakukan
+    sebanyak `max_depth` langkah untuk semua baris dan semua pohon sekaligus.
+
+    `node_mean` (opsional) adalah rata-rata nilai daun di bawah tiap node, berbobot cover; dipakai
+    untuk atribusi per fitur di sepanjang jalur penelusuran yang sama.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, scale, offset, clip_range,
+                 max_depth, base_margin, feature_names, node_mean=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.scale = scale
+        self.offset = offset
+        self.clip_range = clip_range
+        self.node_mean = node_mean
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.feature_names = list(feature_names)
+        self.n_features_in_ = len(self.feature_names)
+
+    @classmethod
+    def load(cls, path=COMPILED_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            if 'scale' not in data.files:
+                raise ValueError(f"'{path}' dibuat dengan format lama (threshold dilipat); ekspor ulang model.")
+            return cls(
+                feature=data['feature'], threshold=data['threshold'], left=data['left'], right=data['right'],
+                default_left=data['default_left'], value=data['value'], roots=data['roots'],
+                scale=data['scale'], offset=data['offset'], clip_range=data['clip_range'],
+                max_depth=data['max_depth'], base_margin=data['base_margin'],
+                feature_names=[str(f) for f in data['feature_names']],
+                node_mean=data['node_mean'] if 'node_mean' in data.files else None,
+            )
+
+    def save(self, path=COMPILED_MODEL_PATH):
+        optional = {} if self.node_mean is None else {'node_mean': self.node_mean}
+        np.savez(
+            path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            default_left=self.default_left, value=self.value, roots=self.roots,
+            scale=self.scale, offset=self.offset, clip_range=self.clip_range,
+            max_depth=np.int32(self.max_depth), base_margin=np.float64(self.base_margin),
+            feature_names=np.array(self.feature_names), **optional,
+        )
+
+    def _as_array(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.feature_names].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Jumlah fitur harus {self.n_features_in_}, diterima {X.shape[1]}.")
+        return X
+
+    def _scale_block(self, X):
+        # Sama dengan MinMaxScaler.transform (float64) lalu konversi float32 oleh DMatrix XGBoost
+        scaled = X * self.scale + self.offset
+        if np.isfinite(self.clip_range).all():
+            np.clip(scaled, self.clip_range[0], self.clip_range[1], out=scaled)
+        return scaled.astype(np.float32)
+
+    def _step(self, X, rows, nodes):
+        x = X[rows, self.feature[nodes]]
+        go_left = np.where(np.isnan(x), self.default_left[nodes], x < self.threshold[nodes])
+        return np.where(go_left, self.left[nodes], self.right[nodes])
+
+    def _leaf_block(self, X):
+        X = self._scale_block(X)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0])).copy()
+        for _ in range(self.max_depth):
+            nodes = self._step(X, rows, nodes)
+        return nodes
+
+    def apply(self, X):
+        """Id daun (lokal per pohon, sama seperti `pred_leaf` XGBoost) untuk setiap baris dan pohon."""
+        X = self._as_array(X)
+        return np.concatenate([self._leaf_block(X[i:i + ROW_BLOCK]) - self.roots
+                               for i in range(0, max(X.shape[0], 1), ROW_BLOCK)])
+
+    def predict_margin(self, X):
+        X = self._as_array(X)
+        if X.shape[0] > ROW_BLOCK:
+            return np.concatenate([self._margin_block(X[i:i + ROW_BLOCK]) for i in range(0, X.shape[0], ROW_BLOCK)])
+        return self._margin_block(X)
+
+    def _margin_block(self, X):
+        return self.value[self._leaf_block(X)].sum(axis=1) + self.base_margin
+
+    def predict_contributions(self, X):
+        """
+        Margin (log-odds) beserta kontribusi per fitur dalam satu penelusuran: setiap split yang dilewati
+        menambahkan selisih `node_mean` anak dan induk ke fitur split tersebut. Jumlah kontribusi + bias
+        sama dengan margin. Mengembalikan (margin, kontribusi [baris x fitur], bias).
+        """
+        if self.node_mean is None:
+            raise ValueError("Model ini tidak menyimpan node_mean; ekspor ulang untuk mendukung atribusi.")
+        X = self._as_array(X)
+        bias = self.base_margin + float(self.node_mean[self.roots].sum())
+        contributions = np.empty_like(X)
+        for i in range(0, X.shape[0], ROW_BLOCK):
+            contributions[i:i + ROW_BLOCK] = self._contributions_block(X[i:i + ROW_BLOCK])
+        return contributions.sum(axis=1) + bias, contributions, bias
+
+    def _contributions_block(self, X):
+        n_rows, n_features = X.shape
+        X = self._scale_block(X)
+        rows = np.arange(n_rows)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.roots.shape[0])).copy()
+        flat = np.zeros(n_rows * n_features)
+        for _ in range(self.max_depth):
+            split_feature = self.feature[nodes]
+            children = self._step(X, rows, nodes)
+            # Di daun, children == nodes sehingga selisihnya nol
+            delta = self.node_mean[children] - self.node_mean[nodes]
+            flat += np.bincount((rows * n_features + split_feature).ravel(), weights=delta.ravel(),
+                                minlength=n_rows * n_features)
+            nodes = children
+        return flat.reshape(n_rows, n_features)
+
+    def predict_proba(self, X):
+        """Probabilitas kelas [0, 1] per baris, setara dengan `XGBClassifier.predict_proba`."""
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+def _parse_base_score(raw):
+    # XGBoost >= 2.1 menyimpan base_score sebagai list, mis. "[5E-1]"
+    return float(str(raw).strip('[]').split(',')[0])
+
+
+def _node_means(tree):
+    """Rata-rata nilai daun di bawah tiap node, berbobot cover (sum_hessian), seperti pada XGBoost."""
+    lc, rc = tree['left_children'], tree['right_children']
+    cover = tree['sum_hessian']
+    means = [0.0] * len(lc)
+    # Anak selalu memiliki id lebih besar dari induknya, sehingga cukup diproses dari belakang
+    for i in reversed(range(len(lc))):
+        if lc[i] == -1:
+            means[i] = float(tree['split_conditions'][i])
+        else:
+            total = cover[lc[i]] + cover[rc[i]]
+            if total > 0:
+                means[i] = (means[lc[i]] * cover[lc[i]] + means[rc[i]] * cover[rc[i]]) / total
+            else:
+                means[i] = (means[lc[i]] + means[rc[i]]) / 2.0
+    return means
+
+
+def compile_model(model, scaler, feature_names):
+    """
+    Mengekspor `XGBClassifier` biner + `MinMaxScaler` menjadi `CompiledEnsemble`.
+    Membutuhkan xgboost (hanya saat ekspor), tidak saat inferensi.
+    """
+    booster = model.get_booster()
+    config = json.loads(booster.save_raw(raw_format='json'))
+    learner = config['learner']
+    objective = learner['objective']['name']
+    if objective not in ('binary:logistic', 'binary:logitraw'):
+        raise ValueError(f"Objektif '{objective}' tidak didukung; hanya klasifikasi biner.")
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Booster '{gbm['name']}' tidak didukung; hanya 'gbtree'.")
+
+    trees = gbm['model']['trees']
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        best_iteration = None
+    if best_iteration is not None:
+        num_parallel_tree = int(gbm['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+        trees = trees[:(best_iteration + 1) * num_parallel_tree]
+
+    base_score = _parse_base_score(learner['learner_model_param']['base_score'])
+    base_margin = np.log(base_score / (1.0 - base_score)) if objective == 'binary:logistic' else base_score
+
+    clip_range = (np.asarray(scaler.feature_range, dtype=np.float64) if getattr(scaler, 'clip', False)
+                  else np.array([-np.inf, np.inf]))
+
+    feature, threshold, left, right, default_left, value, roots, node_mean = [], [], [], [], [], [], [], []
+    max_depth = 0
+    for tree in trees:
+        base = len(feature)
+        roots.append(base)
+        lc, rc = tree['left_children'], tree['right_children']
+        node_mean.extend(_node_means(tree))
+        depth = {0: 0}
+        for i in range(len(lc)):
+            if lc[i] == -1:
+                feature.append(0)
+                threshold.append(0.0)
+                left.append(base + i)
+                right.append(base + i)
+                default_left.append(True)
+                value.append(float(tree['split_conditions'][i]))
+                max_depth = max(max_depth, depth[i])
+            else:
+                f = int(tree['split_indices'][i])
+                feature.append(f)
+                threshold.append(float(tree['split_conditions'][i]))
+                left.append(base + lc[i])
+                right.append(base + rc[i])
+                default_left.append(bool(tree['default_left'][i]))
+                value.append(0.0)
+                depth[lc[i]] = depth[rc[i]] = depth[i] + 1
+
+    return CompiledEnsemble(
+        feature=np.asarray(feature, dtype=np.int32),
+        threshold=np.asarray(threshold, dtype=np.float32),
+        left=np.asarray(left, dtype=np.int32),
+        right=np.asarray(right, dtype=np.int32),
+        default_left=np.asarray(default_left, dtype=bool),
+        value=np.asarray(value, dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.int32),
+        scale=np.asarray(scaler.scale_, dtype=np.float64),
+        offset=np.asarray(scaler.min_, dtype=np.float64),
+        clip_range=clip_range,
+        max_depth=max_depth,
+        base_margin=base_margin,
+        feature_names=feature_names,
+        node_mean=np.asarray(node_mean, dtype=np.float64),
+    )
+
+
+def verify(compiled, model, scaler, X_raw):
+    """Selisih absolut maksimum probabilitas antara model terkompilasi dan booster asli."""
+    import pandas as pd
+
+    X_raw = X_raw[compiled.feature_names]
+    scaled = pd.DataFrame(scaler.transform(X_raw), columns=compiled.feature_names)
+    expected = model.predict_proba(scaled)[:, 1]
+    actual = compiled.predict_proba(X_raw)[:, 1]
+    return float(np.max(np.abs(expected - actual)))
+
+
+def leaf_mismatches(compiled, model, scaler, X_raw):
+    """Jumlah baris yang mendarat di daun berbeda (pada pohon mana pun) dibanding booster asli."""
+    import pandas as pd
+    from xgboost import DMatrix
+
+    X_raw = X_raw[compiled.feature_names]
+    scaled = pd.DataFrame(scaler.transform(X_raw), columns=compiled.feature_names)
+    expected = model.get_booster().predict(DMatrix(scaled), pred_leaf=True,
+                                           iteration_range=(0, len(compiled.roots)))
+    expected = np.asarray(expected, dtype=np.int64).reshape(len(X_raw), -1)
+    return int((expected != compiled.apply(X_raw)).any(axis=1).sum())
+
+
+if __name__ == '__main__':
+    # Penggunaan: python compiled_model.py [output.npz]
+    import pandas as pd
+
+    from klasifikasi import _load_pickles, load_metadata
+
+    model, scaler, _, error = _load_pickles()
+    if error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    feature_names, _ = load_metadata()
+
+    output_path = sys.argv[1] if len(sys.argv) > 1 else COMPILED_MODEL_PATH
+    compiled = compile_model(model, scaler, feature_names)
+    compiled.save(output_path)
+    reference = pd.read_excel('heart_disease_data.xlsx')
+    diff = verify(compiled, model, scaler, reference)
+    mismatches = leaf_mismatches(compiled, model, scaler, reference)
+    print(f"{len(compiled.roots)} pohon ({len(compiled.feature)} node, kedalaman maks {compiled.max_depth}) "
+          f"disimpan ke '{output_path}'. Selisih probabilitas maks vs booster: {diff:.2e}, "
+          f"baris dengan daun berbeda: {mismatches}")
+    if mismatches:
+        sys.exit(1)
@@ -0,0 +1,39 @@
+# fake_llm.py
+
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class FakeStreamingChatModel:
+    """
+    Pengganti lokal `ChatGoogleGenerativeAI` untuk pengujian tanpa jaringan. Mendukung `invoke` dan
+    `stream` dengan latensi yang dapat diatur: `first_token_latency` sebelum token pertama dan
+    `token_latency` di antara token berikutnya (dalam detik).
+    """
+
+    def __init__(self, response=None, first_token_latency=0.3, token_latency=0.02):
+        self.response = response
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+
+    def _reply(self, prompt):
+        if self.response is not None:
+            return self.response
+        question = str(prompt).strip().splitlines()[-1] if str(prompt).strip() else ""
+        return (
+            f"Ini adalah jawaban uji dari model lokal untuk: \"{question}\". "
+            "Saya adalah AI dan tidak bisa menggantikan nasihat medis profesional; "
+            "silakan berkonsultasi dengan dokter untuk diagnosis."
+        )
+
+    def stream(self, prompt):
+        tokens = self._reply(prompt).split(" ")
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(tokens):
+            if i > 0:
+                time.sleep(self.token_latency)
+            yield AIMessageChunk(content=token if i == 0 else " " + token)
+
+    def invoke(self, prompt):
+        return AIMessage(content="".join(chunk.content for chunk in self.stream(prompt)))
@@ -0,0 +1,69 @@
+# import_profile.py
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+def profile_imports(module='main'):
+    """
+    Menjalankan `python -X importtime -c "import <module>"` di proses baru dan mengembalikan
+    waktu impor per paket tingkat atas (dalam milidetik), diurutkan dari yang terlama, beserta
+    himpunan semua paket yang ikut terimpor. Waktu yang dijumlahkan adalah waktu *self* setiap modul
+    di semua tingkat kedalaman, sehingga paket yang diimpor secara bersarang (mis. streamlit di bawah
+    main) tetap muncul sendiri dan tidak ada waktu yang terhitung dua kali.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Gagal mengimpor '{module}':\n{result.stderr[-2000:]}")
+
+    totals = {}
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us = int(parts[0].strip())
+        except ValueError:
+            continue  # baris judul kolom
+        top_level = parts[2].strip().split(".")[0]
+        imported.add(top_level)
+        totals[top_level] = totals.get(top_level, 0.0) + self_us / 1000.0
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True)), imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan waktu impor per modul (ms) untuk mencegah regresi cold start.")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20, help="Jumlah modul yang ditampilkan.")
+    parser.add_argument("--budget-ms", type=float, help="Gagal (exit 1) jika total waktu impor melebihi batas ini.")
+    parser.add_argument("--forbid", nargs="*", default=[],
+                        help="Modul yang tidak boleh ikut terimpor, mis. langchain_core langchain_google_genai xgboost.")
+    parser.add_argument("--json", action="store_true", help="Cetak hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    totals, imported = profile_imports(args.module)
+    total_ms = sum(totals.values())
+    if args.json:
+        print(json.dumps({"total_ms": total_ms, "modules": totals}, indent=2))
+    else:
+        print(f"{'Modul':<32}{'ms':>10}")
+        for name, ms in list(totals.items())[:args.top]:
+            print(f"{name:<32}{ms:>10.1f}")
+        print(f"{'TOTAL':<32}{total_ms:>10.1f}")
+
+    failures = [f"modul terlarang ikut terimpor: {name}" for name in args.forbid if name in imported]
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"total waktu impor {total_ms:.1f} ms melebihi batas {args.budget_ms:.1f} ms")
+    for failure in failures:
+        print(f"GAGAL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# inference_loadgen.py
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+
+
+def load_patients(path='heart_disease_data.xlsx', feature_names=None):
+    """Mengambil contoh pasien dari data referensi sebagai isi permintaan uji beban."""
+    df = pd.read_excel(path)
+    if feature_names is not None:
+        df = df[feature_names]
+    df = df.drop(columns=['num'], errors='ignore').dropna()
+    return df.to_dict(orient='records')
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_load_test(url, patients, clients=200, requests_per_client=50):
+    """
+    Menjalankan `clients` klien bersamaan yang masing-masing mengirim `requests_per_client`
+    permintaan satu-pasien melalui koneksi keep-alive. Mengembalikan latensi p50/p99 (ms),
+    throughput (permintaan/detik), dan jumlah kegagalan.
+    """
+    target = urlparse(url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients + 1)
+
+    def client(client_id):
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        start_barrier.wait()
+        for i in range(requests_per_client):
+            body = json.dumps(patients[(client_id * requests_per_client + i) % len(patients)])
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", target.path or "/predict", body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+                continue
+            local_latencies.append((time.perf_counter() - t0) * 1000.0)
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(c,), daemon=True) for c in range(clients)]
+    for t in threads:
+        t.start()
+    start_barrier.wait()
+    t_start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator beban untuk inference_server.py.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/predict")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50, help="Jumlah permintaan per klien.")
+    parser.add_argument("--data", default="heart_disease_data.xlsx")
+    args = parser.parse_args()
+
+    result = run_load_test(args.url, load_patients(args.data), clients=args.clients, requests_per_client=args.requests)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
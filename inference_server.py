@@ -0,0 +1,221 @@
+# inference_server.py
+
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from batch_scoring import score_frame
+from risk_rules import evaluate_risk_rules
+from tracing import annotate, span, traced
+
+
+class MicroBatcher:
+    """
+    Mengumpulkan permintaan satu-pasien yang datang bersamaan menjadi batch kecil, lalu menilainya
+    dengan satu pemanggilan `predict_proba`. Batch dikirim ketika jumlahnya mencapai `max_batch`
+    atau ketika permintaan tertua sudah menunggu `max_wait_ms`.
+    Jika `watcher` (BundleWatcher) diberikan, model diambil darinya setiap batch agar bundle
+    versi baru langsung terpakai tanpa restart.
+    """
+
+    def __init__(self, model, scaler, feature_names, max_batch=64, max_wait_ms=2.0, watcher=None):
+        self.model = model
+        self.watcher = watcher
+        self.scaler = scaler
+        self.feature_names = feature_names
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, patient):
+        """Memasukkan satu pasien (dict fitur) ke antrean; mengembalikan Future berisi hasilnya."""
+        future = Future()
+        self._queue.put((patient, future))
+        return future
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                with traced("batch"):
+                    annotate("batch_size", str(len(items)))
+                    results = self._score([patient for patient, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(items, results):
+                future.set_result(result)
+            with self._stats_lock:
+                self.batches += 1
+                self.rows += len(items)
+
+    def _score(self, patients):
+        df = pd.DataFrame(patients, columns=self.feature_names).apply(pd.to_numeric, errors='coerce')
+        model = self.watcher.current().model if self.watcher is not None else self.model
+        prediction, prediction_proba = score_frame(model, self.scaler, self.feature_names, df)
+        with span("risk_rules"):
+            rules = evaluate_risk_rules(df).to_numpy()
+        return [
+            {
+                "prediction": int(prediction[i]),
+                "probability": float(prediction_proba[i, 1]),
+                "hasil_prediksi": "Risiko Tinggi Penyakit Jantung" if prediction[i] == 1 else "Risiko Rendah Penyakit Jantung",
+                "faktor_risiko": [s.replace('**', '') for s in rules[i] if s],
+            }
+            for i in range(len(patients))
+        ]
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "rows": self.rows,
+                "avg_batch_size": self.rows / self.batches if self.batches else 0.0,
+            }
+
+
+def _is_number(value):
+    """Nilai fitur harus berupa angka berhingga (atau string angka); bool, null, dan teks lain ditolak."""
+    if isinstance(value, bool) or value is None:
+        return False
+    try:
+        return math.isfinite(float(value))
+    except (TypeError, ValueError):
+        return False
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Antrean koneksi yang lebih panjang agar ratusan klien bersamaan tidak ditolak
+    request_queue_size = 512
+
+
+def make_handler(batcher, feature_names, timeout=10.0):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", "feature_names": feature_names, **batcher.stats()})
+            else:
+                self._send_json(404, {"error": "Endpoint tidak ditemukan."})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "Endpoint tidak ditemukan."})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                self._send_json(400, {"error": "Body permintaan harus berupa JSON yang valid."})
+                return
+
+            # Mendukung satu pasien (objek) maupun beberapa pasien sekaligus (list)
+            patients = payload if isinstance(payload, list) else [payload]
+            for patient in patients:
+                missing = [f for f in feature_names if not isinstance(patient, dict) or f not in patient]
+                if missing:
+                    self._send_json(400, {"error": f"Fitur berikut tidak ditemukan: {', '.join(missing)}"})
+                    return
+                invalid = [f for f in feature_names if not _is_number(patient[f])]
+                if invalid:
+                    self._send_json(400, {"error": f"Nilai fitur berikut harus berupa angka: {', '.join(invalid)}"})
+                    return
+
+            try:
+                with traced("request"), span("wait_batch"):
+                    futures = [batcher.submit(patient) for patient in patients]
+                    results = [future.result(timeout=timeout) for future in futures]
+            except Exception as e:
+                self._send_json(500, {"error": f"Gagal melakukan prediksi: {e}"})
+                return
+            self._send_json(200, results if isinstance(payload, list) else results[0])
+
+        def log_message(self, format, *args):
+            # Nonaktifkan log per permintaan agar tidak membebani server saat beban tinggi
+            pass
+
+    return ScoringHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Layanan HTTP/JSON untuk prediksi risiko penyakit jantung.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=64, help="Jumlah maksimum baris per batch.")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Waktu tunggu maksimum sebelum batch dikirim.")
+    parser.add_argument("--compiled", metavar="NPZ",
+                        help="Gunakan model terkompilasi (compiled_model.py) tanpa xgboost dan scaler terpisah.")
+    parser.add_argument("--bundle", metavar="PATH",
+                        help="File atau direktori bundle ter-mmap (model_bundle.py), dimuat ulang otomatis saat berganti versi.")
+    args = parser.parse_args()
+
+    watcher = None
+    if args.bundle:
+        from model_bundle import BundleWatcher
+
+        watcher = BundleWatcher(args.bundle)
+        model = watcher.current().model
+        scaler, feature_names = None, watcher.current().feature_names
+    elif args.compiled:
+        from compiled_model import CompiledEnsemble
+
+        model = CompiledEnsemble.load(args.compiled)
+        scaler, feature_names = None, model.feature_names
+    else:
+        from klasifikasi import load_model_and_metadata
+
+        model, scaler, feature_names, _ = load_model_and_metadata()
+        if model is None:
+            raise SystemExit("Server tidak dapat dimulai karena model atau scaler gagal dimuat.")
+
+    batcher = MicroBatcher(model, scaler, feature_names, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                           watcher=watcher)
+    server = ScoringServer((args.host, args.port), make_handler(batcher, feature_names))
+    print(f"Melayani prediksi di http://{args.host}:{args.port}/predict "
+          f"(batch maks {args.max_batch} baris / {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
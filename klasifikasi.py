@@ -2,47 +2,140 @@
 
 import streamlit as st
 import pandas as pd
+import os
+import json
+import hashlib
 import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+
+# Bundle model ter-mmap (lihat model_bundle.py). Jika lokasi ini ada, bundle dipakai
+# menggantikan file pickle; jika tidak, aplikasi kembali ke best_xgb_model.pkl + minmaxscaler.pkl.
+# Catatan: dalam mode bundle, skrining kohort (batch_scoring) juga memakai evaluator NumPy
+# `CompiledEnsemble`, yang untuk ribuan baris sekitar 6-8x lebih lambat dari xgboost
+# (mis. ~0.13-0.16 detik vs ~0.02 detik untuk 10.000 baris). Untuk satu pasien justru lebih cepat.
+MODEL_BUNDLE_LOCATION = os.getenv("MODEL_BUNDLE", "model_bundles")
+# Metrik hasil pengukuran train_model.py untuk file pickle (dipakai jika tidak ada bundle)
+MODEL_METRICS_PATH = 'model_metrics.json'
+
 
 @st.cache_resource
-def load_model_and_metadata():
+def _bundle_watcher():
+    if not os.path.exists(MODEL_BUNDLE_LOCATION):
+        return None
+    from model_bundle import BundleWatcher
+    try:
+        return BundleWatcher(MODEL_BUNDLE_LOCATION)
+    except (OSError, ValueError) as e:
+        st.warning(f"Bundle model tidak dapat dimuat, memakai file pickle. Error: {e}")
+        return None
+
+
+def load_metadata():
     """
-    Memuat model XGBoost, MinMaxScaler yang sudah dilatih, dan
-    mendefinisikan metadata terkait (nama fitur dan metrik evaluasi).
+    Metadata model (nama fitur dan metrik evaluasi). Tidak membutuhkan file pickle,
+    sehingga bisa langsung dipakai untuk render pertama halaman.
     """
-    model = None
-    scaler = None
+    watcher = _bundle_watcher()
+    if watcher is not None:
+        bundle = watcher.current()
+        return list(bundle.feature_names), dict(bundle.evaluation_metrics)
+
+    if os.path.exists(MODEL_METRICS_PATH):
+        with open(MODEL_METRICS_PATH, encoding='utf-8') as f:
+            metadata = json.load(f)
+        return list(metadata["feature_names"]), dict(metadata["evaluation_metrics"])
+
+    feature_names = [
+        'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
+        'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal'
+    ]
+
+    evaluation_metrics = {
+        "Akurasi": 0.9344, "Presisi": 0.90, "Recall": 0.9643,
+        "F1-Score": 0.9310, "AUC-ROC": 0.96
+    }
+
+    return feature_names, evaluation_metrics
 
+
+def _load_pickles():
+    """
+    Membuka file model dan scaler. Mengembalikan (model, scaler, versi, pesan_error); versi berasal dari
+    hash isi kedua file yang benar-benar dimuat, sehingga tetap cocok meski file pickle ditulis ulang.
+    """
+    digest = hashlib.sha256()
     # Memuat Model XGBoost
     try:
         with open('best_xgb_model.pkl', 'rb') as file:
-            model = pickle.load(file)
+            data = file.read()
+        digest.update(data)
+        model = pickle.loads(data)
     except FileNotFoundError:
-        st.error("Error: File model 'best_xgb_model.pkl' tidak ditemukan.")
-        return None, None, None, None
+        return None, None, None, "Error: File model 'best_xgb_model.pkl' tidak ditemukan."
     except Exception as e:
-        st.error(f"Gagal memuat model. Error: {e}")
-        return None, None, None, None
+        return None, None, None, f"Gagal memuat model. Error: {e}"
 
     # Memuat MinMaxScaler
     try:
         with open('minmaxscaler.pkl', 'rb') as file:
-            scaler = pickle.load(file)
+            data = file.read()
+        digest.update(data)
+        scaler = pickle.loads(data)
     except FileNotFoundError:
-        st.error("Error: File scaler 'minmaxscaler.pkl' tidak ditemukan.")
-        return None, None, None, None
+        return None, None, None, "Error: File scaler 'minmaxscaler.pkl' tidak ditemukan."
     except Exception as e:
-        st.error(f"Gagal memuat scaler. Error: {e}")
-        return None, None, None, None
+        return None, None, None, f"Gagal memuat scaler. Error: {e}"
 
-    feature_names = [
-        'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
-        'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal'
-    ]
+    return model, scaler, f"pkl-{digest.hexdigest()[:16]}", None
 
-    evaluation_metrics = {
-        "Akurasi": 0.9344, "Presisi": 0.90, "Recall": 0.9643,
-        "F1-Score": 0.9310, "AUC-ROC": 0.96
-    }
 
-    return model, scaler, feature_names, evaluation_metrics
\ No newline at end of file
+@st.cache_resource
+def _model_future():
+    # Satu proses hanya membuka pickle satu kali, di thread latar belakang
+    return _loader.submit(_load_pickles)
+
+
+def preload_model():
+    """Mulai memuat model dan scaler di latar belakang tanpa menunggu hasilnya."""
+    if _bundle_watcher() is None:
+        _model_future()
+
+
+def get_model_and_version():
+    """
+    Menunggu model dan scaler selesai dimuat. Mengembalikan (model, scaler, versi), atau
+    (None, None, None) jika gagal. Versi adalah penanda model yang dikembalikan itu sendiri, untuk
+    kunci cache hasil turunan yang bergantung pada model. Jika bundle ter-mmap dipakai, scaler
+    bernilai None karena sudah termasuk di dalam model.
+    """
+    watcher = _bundle_watcher()
+    if watcher is not None:
+        # Model dan versi diambil dari bundle yang sama, meski hot reload terjadi di antaranya
+        bundle = watcher.current()
+        return bundle.model, None, f"bundle-{bundle.version}"
+
+    model, scaler, version, error = _model_future().result()
+    if error:
+        st.error(error)
+    return model, scaler, version
+
+
+def get_model_and_scaler():
+    """Seperti `get_model_and_version`, tanpa versi. Mengembalikan (None, None) jika gagal."""
+    model, scaler, _ = get_model_and_version()
+    return model, scaler
+
+
+def load_model_and_metadata():
+    """
+    Memuat model XGBoost, MinMaxScaler yang sudah dilatih, dan
+    mendefinisikan metadata terkait (nama fitur dan metrik evaluasi).
+    """
+    model, scaler = get_model_and_scaler()
+    if model is None:
+        return None, None, None, None
+
+    feature_names, evaluation_metrics = load_metadata()
+    return model, scaler, feature_names, evaluation_metrics
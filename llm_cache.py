@@ -0,0 +1,153 @@
+# llm_cache.py
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_CACHE_PATH = 'llm_cache.sqlite3'
+
+
+def normalize_question(question):
+    """Menyeragamkan pertanyaan: huruf kecil, spasi tunggal, tanpa tanda baca di akhir."""
+    text = re.sub(r"\s+", " ", str(question).strip().lower())
+    return text.rstrip(" ?!.")
+
+
+def model_identity(chat_model):
+    """Identitas model chat untuk kunci cache: kelas, nama model, dan temperature."""
+    return "|".join(str(part) for part in (
+        type(chat_model).__name__, getattr(chat_model, 'model', ''), getattr(chat_model, 'temperature', ''),
+    ))
+
+
+def make_cache_key(template, context, question, model_id=""):
+    """
+    Hash SHA-256 dari identitas model, template prompt, konteks analisis, dan pertanyaan yang sudah
+    dinormalisasi. Balasan model berbeda (mis. LLM tiruan vs Gemini) tidak pernah saling tertukar.
+    """
+    digest = hashlib.sha256()
+    for part in (model_id, template, re.sub(r"\s+", " ", (context or "").strip()), normalize_question(question)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache dua tingkat untuk balasan LLM: LRU di dalam proses dan SQLite di disk yang dapat dipakai
+    bersama oleh beberapa proses server. Entri kedaluwarsa setelah `ttl_seconds`; jumlah entri dibatasi
+    `memory_size` (memori) dan `max_disk_entries` (disk, entri tertua dihapus lebih dulu).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=256, max_disk_entries=10_000,
+                 ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_trim = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at)")
+
+    @contextmanager
+    def _connect(self):
+        # Koneksi baru per operasi agar aman dipakai dari banyak thread skrip Streamlit
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key):
+        """Mengembalikan `(value, tier)` dengan tier 'memory' atau 'disk', atau `(None, 'miss')`."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value, "memory"
+                del self._memory[key]
+
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, created_at FROM responses WHERE key = ? AND created_at > ?",
+                        (key, now - self.ttl_seconds),
+                    ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self._count("disk_hits")
+                return row[0], "disk"
+
+        self._count("misses")
+        return None, "miss"
+
+    def _remember(self, key, value, created_at):
+        with self._lock:
+            self._memory[key] = (value, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def put(self, key, value):
+        created_at = time.time()
+        self._remember(key, value, created_at)
+        if not self.path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, created_at),
+                )
+                with self._lock:
+                    self._puts_since_trim += 1
+                    trim = self._puts_since_trim >= 50
+                    if trim:
+                        self._puts_since_trim = 0
+                if trim:
+                    self._trim(conn, created_at)
+        except sqlite3.Error:
+            # Cache bersifat opsional; kegagalan disk tidak boleh mengganggu chat
+            pass
+
+    def _trim(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def stats(self):
+        """Hit memori/disk, miss, jumlah entri di memori, dan hit rate sejak proses dimulai."""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -1,8 +1,12 @@
 # main.py
 
+import uuid
+
 import streamlit as st
-from klasifikasi import load_model_and_metadata  # Kita masih butuh fungsi ini
+from klasifikasi import load_metadata, preload_model
 from main_page import run_main_page        # File baru yang akan kita buat
+from batch_scoring import run_batch_page
+from tracing import traced
 
 # --- Konfigurasi Halaman ---
 st.set_page_config(page_title="Prediksi & Asisten Kesehatan Jantung", layout="wide")
@@ -12,16 +16,18 @@ st.set_page_config(page_title="Prediksi & Asisten Kesehatan Jantung", layout="wi
 
 # --- Aplikasi utama ---
 def main():
-    # Muat model dan metadata SEKALI saja.
-    model, scaler, feature_names, evaluation_metrics = load_model_and_metadata()
-
-    # Periksa apakah model berhasil dimuat sebelum melanjutkan
-    if model is None or scaler is None:
-        st.error("Aplikasi tidak dapat dimulai karena model atau scaler gagal dimuat.")
-        st.stop()
-
-    # Jalankan halaman terpadu yang baru
-    run_main_page(model, scaler, feature_names, evaluation_metrics)
+    # Mulai memuat model dan scaler di latar belakang (SEKALI saja per proses),
+    # agar render pertama halaman tidak menunggu proses unpickle.
+    preload_model()
+    feature_names, evaluation_metrics = load_metadata()
+
+    # Satu catatan trace per rerun (aktif jika TRACE_JSONL di-set, lihat tracing.py)
+    with traced("rerun", session_id=st.session_state.setdefault("trace_session_id", uuid.uuid4().hex)):
+        # Jalankan halaman terpadu yang baru
+        run_main_page(feature_names, evaluation_metrics)
+
+        # Skrining kohort: banyak pasien dari satu file
+        run_batch_page(feature_names)
 
     st.markdown('<div style="text-align: center; color: black; margin-top: 50px;">Dibuat dengan ❤️ oleh Jati Tepatasa Bagastakwa (dibantu AI)</div>', unsafe_allow_html=True)
 
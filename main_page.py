@@ -4,10 +4,16 @@ import streamlit as st
 import pandas as pd
 import os
 import base64
-from dotenv import load_dotenv
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+import time
+from collections import deque
+from attribution import FEATURE_LABELS, explain_patient, risk_factor_texts
+from klasifikasi import get_model_and_version
+from risk_rules import evaluate_risk_rules, saran_for_row
+from llm_cache import DEFAULT_CACHE_PATH, ResponseCache, make_cache_key, model_identity
+from chat_memory import ChatMemory, estimate_tokens
+from tracing import add_duration, annotate, span
+from what_if import render_what_if_panel
+from cohort_index import render_cohort_comparison
 
 # --- BAGIAN 1: KONFIGURASI CHATBOT & FUNGSI BANTU ---
 
@@ -42,25 +48,36 @@ def local_css(file_name):
         st.warning(f"Peringatan: File gambar latar belakang '{file_name}' tidak ditemukan.")
 
 # Konfigurasi Model AI
-# load_dotenv()
-# google_api_key = os.getenv("GOOGLE_API_KEY")
-try:
-    # Saat di-deploy, Streamlit akan mencari secret dengan kunci "GOOGLE_API_KEY"
-    google_api_key = st.secrets["GOOGLE_API_KEY"] 
-except FileNotFoundError:
-    # Ini adalah fallback untuk pengembangan lokal, agar tidak error
-    # Pastikan Anda masih memiliki file secrets.toml di lokal
-    st.error("File secrets tidak ditemukan. Pastikan Anda sudah menambahkannya di pengaturan Streamlit Cloud.")
-    google_api_key = None # Atau muat dari .env jika Anda ingin tetap bisa jalan di lokal
-    
-try:
-    if google_api_key:
-        chat_model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=google_api_key, temperature=0.7)
-    else:
-        chat_model = None
-except Exception as e:
-    st.error(f"Gagal menginisialisasi model Gemini: {e}")
-    chat_model = None
+# langchain dan Gemini baru diimpor dan dibangun saat pertanyaan chat pertama,
+# sehingga render awal (dan pengguna yang hanya butuh prediksi) tidak menanggung biayanya.
+@st.cache_resource
+def get_chat_model():
+    """Membangun model chat sekali per proses. Mengembalikan None jika gagal."""
+    if os.getenv("USE_FAKE_LLM") == "1":
+        # Model lokal tanpa jaringan untuk pengujian (lihat fake_llm.py)
+        from fake_llm import FakeStreamingChatModel
+        return FakeStreamingChatModel(first_token_latency=float(os.getenv("FAKE_LLM_FIRST_TOKEN_S", "0.3")),
+                                      token_latency=float(os.getenv("FAKE_LLM_TOKEN_S", "0.02")))
+
+    # load_dotenv()
+    # google_api_key = os.getenv("GOOGLE_API_KEY")
+    try:
+        # Saat di-deploy, Streamlit akan mencari secret dengan kunci "GOOGLE_API_KEY"
+        google_api_key = st.secrets["GOOGLE_API_KEY"] 
+    except FileNotFoundError:
+        # Ini adalah fallback untuk pengembangan lokal, agar tidak error
+        # Pastikan Anda masih memiliki file secrets.toml di lokal
+        st.error("File secrets tidak ditemukan. Pastikan Anda sudah menambahkannya di pengaturan Streamlit Cloud.")
+        google_api_key = None # Atau muat dari .env jika Anda ingin tetap bisa jalan di lokal
+
+    try:
+        if google_api_key:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            return ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=google_api_key, temperature=0.7)
+        return None
+    except Exception as e:
+        st.error(f"Gagal menginisialisasi model Gemini: {e}")
+        return None
 
 # Template ini digunakan SEBELUM prediksi dibuat
 generic_prompt_template = """
@@ -70,12 +87,11 @@ Saat ini Anda belum memiliki data spesifik dari pengguna.
 Jawab pertanyaan pengguna berikut dengan ramah dan informatif.
 Selalu ingatkan pengguna bahwa Anda adalah AI dan tidak bisa menggantikan nasihat medis profesional, dan sarankan untuk berkonsultasi dengan dokter untuk diagnosis.
 
+Riwayat percakapan sebelumnya (gunakan jika relevan):
+{chat_history}
+
 Pertanyaan Pengguna: {question}
 """
-GENERIC_PROMPT = PromptTemplate(
-    input_variables=["question"],
-    template=generic_prompt_template,
-)
 
 
 # Template prompt yang dinamis (digunakan SETELAH prediksi)
@@ -92,12 +108,29 @@ Berdasarkan konteks di atas, jawablah pertanyaan pengguna berikut dengan ramah.
 Fokuslah pada saran gaya hidup sehat (diet, olahraga), penjelasan istilah medis yang ada di hasil analisis, dan langkah-langkah preventif.
 Selalu ingatkan pengguna bahwa Anda adalah AI dan tidak bisa menggantikan nasihat medis profesional, dan sarankan untuk berkonsultasi dengan dokter.
 
+Riwayat percakapan sebelumnya (gunakan jika relevan):
+{chat_history}
+
 Pertanyaan Pengguna: {question}
 """
-CONTEXTUAL_PROMPT = PromptTemplate(
-    input_variables=["analysis_result", "question"],
-    template=contextual_prompt_template,
-)
+
+# Batas token (perkiraan) untuk seluruh prompt yang dikirim ke model; riwayat mengisi sisa anggaran
+PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "2000"))
+
+@st.cache_resource
+def get_prompt_templates():
+    """Mengembalikan (GENERIC_PROMPT, CONTEXTUAL_PROMPT); langchain_core diimpor saat pertama dipakai."""
+    from langchain_core.prompts import PromptTemplate
+
+    generic_prompt = PromptTemplate(
+        input_variables=["chat_history", "question"],
+        template=generic_prompt_template,
+    )
+    contextual_prompt = PromptTemplate(
+        input_variables=["analysis_result", "chat_history", "question"],
+        template=contextual_prompt_template,
+    )
+    return generic_prompt, contextual_prompt
 
 def generate_text_summary_for_chatbot(user_df, prediction, prediction_proba, saran_list):
     """Membuat ringkasan teks yang akan menjadi konteks awal untuk chatbot."""
@@ -114,8 +147,31 @@ def generate_text_summary_for_chatbot(user_df, prediction, prediction_proba, sar
         summary += "Tidak ada faktor risiko utama yang menonjol.\n\n"
     return summary
 
+@st.cache_resource
+def get_response_cache():
+    """Cache balasan LLM per proses server (tingkat disk dipakai bersama antar proses)."""
+    return ResponseCache(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+
+def stream_chat_response(chat_model, prompt, timings):
+    """
+    Mengalirkan balasan model token demi token. Waktu hingga token pertama (`ttft_s`) dan total
+    waktu generasi (`total_s`) dicatat ke dict `timings`.
+    """
+    start = time.perf_counter()
+    for chunk in chat_model.stream(prompt):
+        if not chunk.content:
+            continue
+        if "ttft_s" not in timings:
+            timings["ttft_s"] = time.perf_counter() - start
+        yield chunk.content
+    timings["total_s"] = time.perf_counter() - start
+
 def render_metric_bar(label, value, unit, normal_range_str, color, value_percentage):
     """Fungsi untuk membuat visualisasi bar."""
+    with span("render_metrics"):
+        _render_metric_bar_html(label, value, unit, normal_range_str, color, value_percentage)
+
+def _render_metric_bar_html(label, value, unit, normal_range_str, color, value_percentage):
     st.markdown(f"""
     <div style="margin-bottom: 12px;">
         <strong>{label}: {value} {unit}</strong>
@@ -128,9 +184,10 @@ def render_metric_bar(label, value, unit, normal_range_str, color, value_percent
 
 # --- BAGIAN 2: HALAMAN UTAMA YANG TERPADU ---
 
-def run_main_page(model, scaler, feature_names, eval_metrics):
+def run_main_page(feature_names, eval_metrics):
     # Panggil fungsi CSS baru Anda
-    local_css("human-heart-design.jpg")
+    with span("css"):
+        local_css("human-heart-design.jpg")
     
     # Judul utama disesuaikan dengan style baru
     st.markdown(
@@ -144,11 +201,10 @@ def run_main_page(model, scaler, feature_names, eval_metrics):
         st.session_state.prediction_made = False
     if "initial_context" not in st.session_state:
         st.session_state.initial_context = ""
-    # Tambahkan pesan sambutan awal jika riwayat chat kosong
-    if "chat_history" not in st.session_state or not st.session_state.chat_history:
-        st.session_state.chat_history = [
-            AIMessage(content="Halo! Saya adalah Asisten Kesehatan Jantung. Silakan isi data pada formulir untuk mendapatkan analisis risiko, atau Anda bisa langsung mengajukan pertanyaan umum tentang kesehatan jantung di bawah ini.")
-        ]
+    # Pesan sambutan hanya untuk tampilan; tidak masuk ke memori percakapan yang dikirim ke model
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_banner = "Halo! Saya adalah Asisten Kesehatan Jantung. Silakan isi data pada formulir untuk mendapatkan analisis risiko, atau Anda bisa langsung mengajukan pertanyaan umum tentang kesehatan jantung di bawah ini."
+        st.session_state.chat_memory = ChatMemory()
 
 
     col1, col2 = st.columns([2, 1])
@@ -198,33 +254,36 @@ def run_main_page(model, scaler, feature_names, eval_metrics):
         user_df = pd.DataFrame([user_data])[feature_names]
 
         with st.spinner("Menganalisis data Anda..."):
-            scaled_user_data_np = scaler.transform(user_df)
-            scaled_user_data = pd.DataFrame(scaled_user_data_np, columns=feature_names)
-            prediction = model.predict(scaled_user_data)
-            prediction_proba = model.predict_proba(scaled_user_data)
-            saran = []
-            thal_options_desc = {3.0: 'Normal', 6.0: 'Cacat Tetap (Fixed Defect)', 7.0: 'Cacat Reversibel (Reversible Defect)'}
-            if user_df['trestbps'].iloc[0] >= 140: saran.append("Tekanan darah tergolong **Hipertensi Stadium 2**.")
-            elif user_df['trestbps'].iloc[0] >= 130: saran.append("Tekanan darah tergolong **Hipertensi Stadium 1**.")
-            elif user_df['trestbps'].iloc[0] >= 120: saran.append("Tekanan darah **meningkat (elevated)**.")
-            if user_df['chol'].iloc[0] >= 240: saran.append("Kadar kolesterol tergolong **tinggi**.")
-            elif user_df['chol'].iloc[0] >= 200: saran.append("Kadar kolesterol di **batas tinggi**.")
-            if user_df['fbs'].iloc[0] == 1: saran.append("Gula darah puasa **terindikasi tinggi** (> 120 mg/dl), merupakan faktor risiko diabetes.")
-            if user_df['cp'].iloc[0] != 4: saran.append(f"Adanya riwayat **nyeri dada** ({cp_desc.split(': ')[1]}).")
-            if user_df['exang'].iloc[0] == 1: saran.append("Mengalami **angina (nyeri dada) saat berolahraga**.")
-            if user_df['ca'].iloc[0] > 0: saran.append(f"Terdeteksi **{int(user_df['ca'].iloc[0])} pembuluh darah utama menyempit** berdasarkan hasil tes.")
-            thal_val = user_df['thal'].iloc[0]
-            if thal_val in [6.0, 7.0]: saran.append(f"Hasil Thallium Stress Test ({thal_val}) terindikasi sebagai **faktor risiko ({thal_options_desc.get(thal_val, 'N/A')})**.")
+            # Model sudah mulai dimuat di latar belakang sejak render pertama (lihat main.py)
+            with span("model_load"):
+                model, scaler, version = get_model_and_version()
+            if model is None:
+                st.error("Prediksi tidak dapat dilakukan karena model atau scaler gagal dimuat.")
+                st.stop()
+            # Probabilitas dan kontribusi per fitur dihitung dalam satu penelusuran model
+            with span("attribution"):
+                patient = tuple(float(v) for v in user_df.iloc[0])
+                prediction, prediction_proba, contributions = explain_patient(
+                    model, scaler, list(feature_names), patient, version)
+            if contributions is not None:
+                contributions = contributions.iloc[0]
+                saran = risk_factor_texts(user_df.iloc[0], contributions)
+            else:
+                # Model terkompilasi lama tanpa data atribusi: kembali ke aturan berbasis pedoman
+                saran = saran_for_row(evaluate_risk_rules(user_df))
 
         st.session_state.prediction_made = True
         st.session_state.saran = saran
+        st.session_state.contributions = contributions
         st.session_state.user_df = user_df
         st.session_state.prediction = prediction
         st.session_state.prediction_proba = prediction_proba
         
         initial_context = generate_text_summary_for_chatbot(user_df, prediction, prediction_proba, saran)
         st.session_state.initial_context = initial_context
-        st.session_state.chat_history = [AIMessage(content=f"Analisis selesai! Berikut adalah ringkasan hasil Anda. Anda dapat menanyakan apa pun terkait hasil ini.\n\n{initial_context}")]
+        # Ringkasan analisis sudah dikirim lewat {analysis_result}; banner ini hanya untuk tampilan
+        st.session_state.chat_banner = f"Analisis selesai! Berikut adalah ringkasan hasil Anda. Anda dapat menanyakan apa pun terkait hasil ini.\n\n{initial_context}"
+        st.session_state.chat_memory = ChatMemory()
         st.rerun()
 
 
@@ -242,6 +301,10 @@ def run_main_page(model, scaler, feature_names, eval_metrics):
             if st.session_state.saran:
                 st.markdown("##### Faktor Risiko yang Menonjol dari Input Anda:")
                 for s in st.session_state.saran: st.markdown(f"• {s}")
+                contributions = st.session_state.get("contributions")
+                if contributions is not None:
+                    st.bar_chart(contributions.rename(index=FEATURE_LABELS).sort_values(), height=260)
+                    st.caption("Kontribusi tiap fitur terhadap skor model (log-odds): positif menaikkan risiko, negatif menurunkannya.")
                 st.markdown("<br><i>Disarankan untuk mendiskusikan faktor-faktor ini dengan dokter Anda untuk evaluasi lebih lanjut.</i>", unsafe_allow_html=True)
             else:
                 st.markdown("Berdasarkan input Anda, tidak ada faktor risiko utama yang menonjol secara spesifik. Tetaplah menjaga gaya hidup sehat dan lakukan pemeriksaan rutin.")
@@ -274,6 +337,13 @@ def run_main_page(model, scaler, feature_names, eval_metrics):
             pct_oldpeak = min((val_oldpeak / 4.0) * 100, 100)
             render_metric_bar("Depresi ST (oldpeak)", val_oldpeak, "", "Normalnya < 1.0", color_oldpeak, pct_oldpeak)
 
+            st.markdown("<br>", unsafe_allow_html=True)
+            with span("cohort"):
+                render_cohort_comparison(feature_names)
+
+        with span("what_if"):
+            render_what_if_panel(feature_names)
+
 
     # --- PERUBAHAN DIMULAI DI SINI ---
     # Bungkus seluruh antarmuka chat dengan kolom untuk mengontrol lebarnya
@@ -287,36 +357,81 @@ def run_main_page(model, scaler, feature_names, eval_metrics):
         else:
             st.markdown("<h3>💬 Tanya Jawab Umum dengan Asisten AI</h3>", unsafe_allow_html=True)
 
-        # Menampilkan riwayat chat
-        for message in st.session_state.chat_history:
-            role = "human" if isinstance(message, HumanMessage) else "ai"
+        # Menampilkan riwayat chat: giliran lama sudah dilipat ke ringkasan, hanya giliran terbaru yang dirender
+        memory = st.session_state.chat_memory
+        if banner := st.session_state.get("chat_banner"):
+            with st.chat_message("ai"):
+                st.markdown(banner)
+        if memory.summary:
+            with st.expander(f"🗂️ {memory.folded_turns} pesan sebelumnya telah diringkas"):
+                st.markdown(memory.summary.replace("\n", "  \n"))
+        for role, content in memory.messages():
             with st.chat_message(role):
-                st.markdown(message.content)
+                st.markdown(content)
 
         # Input chat dari pengguna
         if user_question := st.chat_input("Tanyakan sesuatu..."):
-            st.session_state.chat_history.append(HumanMessage(content=user_question))
             with st.chat_message("human"):
                 st.markdown(user_question)
 
-            with st.spinner("Asisten sedang berpikir..."):
-                if st.session_state.prediction_made:
-                    # Jika prediksi sudah ada, gunakan prompt kontekstual
-                    prompt_to_use = CONTEXTUAL_PROMPT.format(
-                        analysis_result=st.session_state.initial_context, 
-                        question=user_question
-                    )
-                else:
-                    # Jika belum, gunakan prompt umum
-                    prompt_to_use = GENERIC_PROMPT.format(question=user_question)
-
-                if chat_model:
-                    response = chat_model.invoke(prompt_to_use)
-                    ai_response = response.content
+            GENERIC_PROMPT, CONTEXTUAL_PROMPT = get_prompt_templates()
+            if st.session_state.prediction_made:
+                prompt_template, context = CONTEXTUAL_PROMPT, st.session_state.initial_context
+            else:
+                prompt_template, context = GENERIC_PROMPT, ""
+
+            # Riwayat mengisi sisa anggaran token setelah template, konteks, dan pertanyaan
+            history_budget = PROMPT_TOKEN_BUDGET - estimate_tokens(prompt_template.template) \
+                - estimate_tokens(context) - estimate_tokens(user_question)
+            chat_history_text = memory.render_history(history_budget)
+            memory.add("human", user_question)
+
+            if st.session_state.prediction_made:
+                # Jika prediksi sudah ada, gunakan prompt kontekstual
+                prompt_to_use = CONTEXTUAL_PROMPT.format(
+                    analysis_result=st.session_state.initial_context, 
+                    chat_history=chat_history_text,
+                    question=user_question
+                )
+            else:
+                # Jika belum, gunakan prompt umum
+                prompt_to_use = GENERIC_PROMPT.format(chat_history=chat_history_text, question=user_question)
+
+            # Pertanyaan yang sama dengan konteks (dan riwayat) yang sama dijawab dari cache tanpa memanggil Gemini.
+            # Identitas model ikut di kunci agar balasan LLM tiruan tidak pernah diberikan ke pengguna sungguhan.
+            chat_model = get_chat_model()
+            cached_response, cache_tier = None, "miss"
+            if chat_model is not None:
+                response_cache = get_response_cache()
+                cache_key = make_cache_key(prompt_template.template, f"{context}\n{chat_history_text}", user_question,
+                                           model_id=model_identity(chat_model))
+                with span("llm_cache"):
+                    cached_response, cache_tier = response_cache.get(cache_key)
+                # Penghitung kumulatif per proses server (hit memori/disk, miss, hit rate) ikut di setiap trace chat
+                annotate("llm_cache_stats", response_cache.stats())
+            annotate("llm_cache", cache_tier)
+
+            # Balasan dialirkan langsung ke gelembung chat, tanpa st.rerun() setelahnya
+            timings = {"cache": cache_tier}
+            with st.chat_message("ai"):
+                if cached_response is not None:
+                    ai_response = cached_response
+                    st.markdown(ai_response)
+                elif chat_model is not None:
+                    try:
+                        with span("llm"):
+                            ai_response = st.write_stream(stream_chat_response(chat_model, prompt_to_use, timings))
+                        if "ttft_s" in timings:
+                            add_duration("llm_ttft", timings["ttft_s"])
+                        response_cache.put(cache_key, ai_response)
+                    except Exception as e:
+                        ai_response = f"Maaf, terjadi kesalahan saat menghubungi model AI: {e}"
+                        st.markdown(ai_response)
                 else:
                     ai_response = "Maaf, koneksi ke model AI gagal."
+                    st.markdown(ai_response)
 
-                st.session_state.chat_history.append(AIMessage(content=ai_response))
-                # Jalankan ulang skrip untuk langsung menampilkan balasan AI tanpa perlu input lagi
-                st.rerun() 
+            memory.add("ai", ai_response)
+            # Waktu per pesan (time-to-first-token, total) disimpan terbatas, terpisah dari isi percakapan
+            st.session_state.setdefault("chat_timings", deque(maxlen=50)).append(timings)
     # --- PERUBAHAN SELESAI DI SINI ---
\ No newline at end of file
@@ -0,0 +1,248 @@
+# model_bundle.py
+
+import glob
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from compiled_model import CompiledEnsemble
+
+# Format file bundle (little-endian):
+#   MAGIC (8 byte) | panjang header (uint64) | header JSON (UTF-8) | padding | payload array
+# Setiap array di payload disejajarkan ke ALIGN byte sehingga bisa langsung dipetakan (mmap)
+# sebagai view NumPy read-only. Halaman file dibagi oleh semua proses melalui page cache OS.
+MAGIC = b"HRTBNDL\x00"
+# Versi 2: affine map scaler disimpan terpisah (threshold tidak lagi dilipat ke nilai mentah)
+FORMAT_VERSION = 2
+ALIGN = 64
+DEFAULT_BUNDLE_DIR = 'model_bundles'
+BUNDLE_SUFFIX = '.bundle'
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots', 'scale', 'offset',
+                'clip_range')
+# Array yang boleh tidak ada pada bundle lama
+OPTIONAL_ARRAY_FIELDS = ('node_mean',)
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class ModelBundle:
+    """Model terkompilasi (scaler sudah termasuk) beserta metadata yang dibaca dari file bundle."""
+
+    def __init__(self, model, feature_names, evaluation_metrics, version, path, header):
+        self.model = model
+        self.feature_names = feature_names
+        self.evaluation_metrics = evaluation_metrics
+        self.version = version
+        self.path = path
+        self.header = header
+
+
+def write_bundle(path, compiled, evaluation_metrics, version=None, extra=None):
+    """
+    Menulis `CompiledEnsemble` + metrik evaluasi ke file bundle. File ditulis ke path sementara lalu
+    di-`os.replace`, sehingga proses lain tidak pernah melihat file setengah jadi.
+    """
+    arrays = {name: np.ascontiguousarray(getattr(compiled, name)) for name in ARRAY_FIELDS}
+    for name in OPTIONAL_ARRAY_FIELDS:
+        if getattr(compiled, name, None) is not None:
+            arrays[name] = np.ascontiguousarray(getattr(compiled, name))
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset,
+                        "nbytes": int(array.nbytes)}
+        offset += array.nbytes
+
+    payload = bytearray(_align(offset))
+    for name, array in arrays.items():
+        start = layout[name]["offset"]
+        payload[start:start + array.nbytes] = array.tobytes()
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "version": int(version if version is not None else time.time()),
+        "created_at": time.time(),
+        "feature_names": list(compiled.feature_names),
+        "evaluation_metrics": dict(evaluation_metrics),
+        "max_depth": compiled.max_depth,
+        "base_margin": compiled.base_margin,
+        "arrays": layout,
+        "payload_nbytes": len(payload),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        **(extra or {}),
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\x00" * (data_start - len(MAGIC) - 8 - len(header_bytes)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path):
+    """Membaca header JSON saja (tanpa memetakan payload)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' bukan file bundle model.")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Versi format bundle {header.get('format_version')} tidak didukung.")
+    return header, _align(len(MAGIC) + 8 + header_len)
+
+
+def load_bundle(path, verify=True):
+    """
+    Memetakan file bundle secara read-only. Array model adalah view langsung ke mmap, sehingga
+    banyak proses yang memuat bundle yang sama berbagi memori fisik yang sama.
+    """
+    header, data_start = read_header(path)
+    payload = np.memmap(path, dtype=np.uint8, mode='r', offset=data_start, shape=(header["payload_nbytes"],))
+    if verify and hashlib.sha256(payload).hexdigest() != header["sha256"]:
+        raise ValueError(f"Checksum bundle '{path}' tidak cocok; file mungkin rusak.")
+
+    arrays = {}
+    for name in ARRAY_FIELDS + OPTIONAL_ARRAY_FIELDS:
+        spec = header["arrays"].get(name)
+        if spec is None:
+            continue
+        start = spec["offset"]
+        arrays[name] = payload[start:start + spec["nbytes"]].view(np.dtype(spec["dtype"])).reshape(spec["shape"])
+
+    model = CompiledEnsemble(max_depth=header["max_depth"], base_margin=header["base_margin"],
+                             feature_names=header["feature_names"], **arrays)
+    return ModelBundle(model, header["feature_names"], header["evaluation_metrics"], header["version"], path, header)
+
+
+def bundle_candidates(location):
+    """
+    `location` berupa file bundle atau direktori; untuk direktori dikembalikan semua bundle yang
+    header-nya terbaca, urut dari versi tertinggi.
+    """
+    if not os.path.isdir(location):
+        return [location]
+    candidates = []
+    for path in glob.glob(os.path.join(location, f"*{BUNDLE_SUFFIX}")):
+        try:
+            candidates.append((read_header(path)[0]["version"], path))
+        except (OSError, ValueError):
+            continue
+    if not candidates:
+        raise FileNotFoundError(f"Tidak ada file '*{BUNDLE_SUFFIX}' yang valid di '{location}'.")
+    return [path for _, path in sorted(candidates, reverse=True)]
+
+
+def load_latest_bundle(location):
+    """
+    Memuat bundle valid dengan versi tertinggi. Jika payload bundle terbaru gagal diverifikasi
+    (mis. checksum rusak), versi di bawahnya dicoba, sehingga satu file rusak tidak mematikan
+    semua bundle saat start.
+    """
+    error = None
+    for path in bundle_candidates(location):
+        try:
+            return load_bundle(path)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"Bundle '{path}' dilewati: {e}")
+            error = e
+    raise error
+
+
+class BundleWatcher:
+    """
+    Menyimpan bundle aktif dan memuat ulang otomatis ketika versi baru diletakkan di lokasi yang sama.
+    Pemeriksaan (stat direktori/file) paling sering dilakukan sekali per `check_interval` detik.
+    Bundle yang gagal diverifikasi dilewati dan versi valid berikutnya yang dipakai, baik saat start
+    maupun saat memuat ulang (bundle aktif tetap dipakai jika tidak ada yang lebih baru dan valid).
+    """
+
+    def __init__(self, location, check_interval=2.0):
+        self.location = location
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = self._stat_signature()
+        self._bundle = load_latest_bundle(location)
+        self._last_check = time.monotonic()
+
+    def _stat_signature(self):
+        if os.path.isdir(self.location):
+            paths = sorted(glob.glob(os.path.join(self.location, f"*{BUNDLE_SUFFIX}")))
+        else:
+            paths = [self.location]
+        signature = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signature.append((path, st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            with self._lock:
+                if now - self._last_check >= self.check_interval:
+                    self._last_check = now
+                    self._maybe_reload()
+        return self._bundle
+
+    def _maybe_reload(self):
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return
+        self._signature = signature
+        try:
+            candidates = bundle_candidates(self.location)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"Bundle model baru tidak dimuat, tetap memakai versi {self._bundle.version}: {e}")
+            return
+        # Versi valid tertinggi dipakai; jika itu bundle aktif (mis. yang lebih baru rusak), tidak ada perubahan
+        for path in candidates:
+            try:
+                header, _ = read_header(path)
+                if path == self._bundle.path and header["sha256"] == self._bundle.header["sha256"]:
+                    return
+                self._bundle = load_bundle(path)
+                return
+            except (OSError, ValueError) as e:
+                warnings.warn(f"Bundle model '{path}' tidak dimuat, tetap memakai versi {self._bundle.version}: {e}")
+
+
+if __name__ == '__main__':
+    # Penggunaan: python model_bundle.py [direktori_atau_file_tujuan]
+    # Mengonversi best_xgb_model.pkl + minmaxscaler.pkl menjadi bundle versi baru.
+    from compiled_model import compile_model
+    from klasifikasi import _load_pickles, load_metadata
+
+    model, scaler, _, error = _load_pickles()
+    if error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    feature_names, evaluation_metrics = load_metadata()
+
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BUNDLE_DIR
+    version = int(time.time())
+    if not target.endswith(BUNDLE_SUFFIX):
+        os.makedirs(target, exist_ok=True)
+        target = os.path.join(target, f"heart-{version}{BUNDLE_SUFFIX}")
+    header = write_bundle(target, compile_model(model, scaler, feature_names), evaluation_metrics, version=version)
+    print(f"Bundle versi {header['version']} ditulis ke '{target}' ({header['payload_nbytes']:,} byte payload).")
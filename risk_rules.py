@@ -0,0 +1,95 @@
+# risk_rules.py
+
+import numpy as np
+import pandas as pd
+
+# Deskripsi tipe nyeri dada dan hasil tes thallium, sama dengan pilihan pada formulir
+CP_DESC = {1: 'Typical Angina', 2: 'Atypical Angina', 3: 'Non-anginal Pain', 4: 'Asymptomatic'}
+THAL_DESC = {3.0: 'Normal', 6.0: 'Cacat Tetap (Fixed Defect)', 7.0: 'Cacat Reversibel (Reversible Defect)'}
+
+# Urutan kolom mengikuti urutan pengecekan saran pada halaman utama
+RISK_RULE_COLUMNS = ['tekanan_darah', 'kolesterol', 'gula_darah', 'nyeri_dada', 'angina_olahraga', 'pembuluh_darah', 'thallium']
+
+
+def _numeric(df, column):
+    return pd.to_numeric(df[column], errors='coerce').to_numpy()
+
+
+def _texts(values, mask, fmt):
+    """
+    Teks `fmt(nilai)` untuk baris yang memenuhi `mask` dan string kosong untuk baris lain. `fmt`
+    dipanggil sekali per nilai unik, sehingga biayanya hampir tetap berapa pun jumlah barisnya.
+    """
+    texts = np.full(len(values), "", dtype=object)
+    if mask.any():
+        unique, inverse = np.unique(values[mask], return_inverse=True)
+        texts[mask] = np.array([fmt(value) for value in unique], dtype=object)[inverse]
+    return texts
+
+
+def evaluate_risk_rules(df):
+    """
+    Mengevaluasi aturan faktor risiko untuk seluruh baris sekaligus (mask NumPy per kolom, tanpa loop
+    per pasien; teks hanya dibentuk untuk baris yang memenuhi aturan). Mengembalikan DataFrame dengan
+    satu kolom per aturan berisi teks saran, atau string kosong jika aturan tersebut tidak berlaku.
+    """
+    trestbps = _numeric(df, 'trestbps')
+    chol = _numeric(df, 'chol')
+    fbs = _numeric(df, 'fbs')
+    cp = _numeric(df, 'cp')
+    exang = _numeric(df, 'exang')
+    ca = _numeric(df, 'ca')
+    thal = _numeric(df, 'thal').astype(float)
+
+    rules = {}
+    rules['tekanan_darah'] = np.select(
+        [trestbps >= 140, trestbps >= 130, trestbps >= 120],
+        ["Tekanan darah tergolong **Hipertensi Stadium 2**.",
+         "Tekanan darah tergolong **Hipertensi Stadium 1**.",
+         "Tekanan darah **meningkat (elevated)**."],
+        default="",
+    )
+    rules['kolesterol'] = np.select(
+        [chol >= 240, chol >= 200],
+        ["Kadar kolesterol tergolong **tinggi**.", "Kadar kolesterol di **batas tinggi**."],
+        default="",
+    )
+    rules['gula_darah'] = np.where(
+        fbs == 1, "Gula darah puasa **terindikasi tinggi** (> 120 mg/dl), merupakan faktor risiko diabetes.", ""
+    )
+
+    rules['nyeri_dada'] = _texts(
+        cp, ~pd.isna(cp) & (cp != 4),
+        lambda v: f"Adanya riwayat **nyeri dada** ({CP_DESC.get(v, str(v))}).",
+    )
+
+    rules['angina_olahraga'] = np.where(exang == 1, "Mengalami **angina (nyeri dada) saat berolahraga**.", "")
+
+    rules['pembuluh_darah'] = _texts(
+        ca, ca > 0,
+        lambda v: f"Terdeteksi **{int(v)} pembuluh darah utama menyempit** berdasarkan hasil tes.",
+    )
+
+    rules['thallium'] = _texts(
+        thal, np.isin(thal, (6.0, 7.0)),
+        lambda v: (f"Hasil Thallium Stress Test ({float(v)}) terindikasi sebagai **faktor risiko ("
+                   f"{THAL_DESC.get(float(v), 'N/A')})**."),
+    )
+
+    return pd.DataFrame({column: rules[column] for column in RISK_RULE_COLUMNS}, index=df.index, dtype=object)
+
+
+def saran_for_row(rules, position=0):
+    """Mengambil daftar saran (teks tidak kosong) untuk satu baris hasil `evaluate_risk_rules`."""
+    return [s for s in rules.iloc[position].tolist() if s]
+
+
+def join_saran(rules, sep="; "):
+    """Menggabungkan semua saran per baris menjadi satu teks tanpa markup tebal (untuk file hasil)."""
+    joined = pd.Series("", index=rules.index, dtype=object)
+    for column in RISK_RULE_COLUMNS:
+        text = rules[column]
+        has_text = text != ""
+        prefix = pd.Series(np.where(has_text & (joined != ""), sep, ""), index=rules.index, dtype=object)
+        joined = joined + prefix + text
+    return joined.str.replace('**', '', regex=False)
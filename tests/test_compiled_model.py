@@ -0,0 +1,71 @@
+# Paritas CompiledEnsemble vs booster XGBoost asli pada data referensi dan sapuan nilai per fitur.
+
+import os
+import pickle
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+pytest.importorskip("sklearn")
+pytest.importorskip("xgboost")
+
+from compiled_model import compile_model, leaf_mismatches, verify  # noqa: E402
+from train_model import FEATURE_NAMES  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    with open(os.path.join(ROOT, 'best_xgb_model.pkl'), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(ROOT, 'minmaxscaler.pkl'), 'rb') as f:
+        scaler = pickle.load(f)
+    feature_names = list(FEATURE_NAMES)
+    reference = pd.read_excel(os.path.join(ROOT, 'heart_disease_data.xlsx'))
+    reference[feature_names] = reference[feature_names].apply(pd.to_numeric, errors='coerce')
+    return model, scaler, feature_names, reference
+
+
+def _sweep(reference, feature_names):
+    """
+    Untuk setiap fitur: semua nilai teramati dan (untuk fitur bilangan bulat) semua bilangan bulat di
+    antara min dan max, dengan fitur lain pada median. Nilai tepat di cut `hist` ikut teruji.
+    """
+    base = reference[feature_names].median()
+    frames = []
+    for name in feature_names:
+        column = reference[name].dropna()
+        values = np.unique(column.to_numpy(dtype=float))
+        if np.all(values == np.round(values)):
+            values = np.union1d(values, np.arange(values.min(), values.max() + 1))
+        frame = pd.DataFrame([base] * len(values)).reset_index(drop=True)
+        frame[name] = values
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_reference_rows_follow_booster_leaves(artifacts):
+    model, scaler, feature_names, reference = artifacts
+    compiled = compile_model(model, scaler, feature_names)
+    rows = reference[feature_names]
+    assert leaf_mismatches(compiled, model, scaler, rows) == 0
+    assert verify(compiled, model, scaler, rows) < 1e-5
+
+
+def test_value_sweep_follows_booster_leaves(artifacts):
+    model, scaler, feature_names, reference = artifacts
+    compiled = compile_model(model, scaler, feature_names)
+    rows = _sweep(reference, feature_names)
+    assert leaf_mismatches(compiled, model, scaler, rows) == 0
+    assert verify(compiled, model, scaler, rows) < 1e-5
+
+
+def test_missing_values_follow_default_direction(artifacts):
+    model, scaler, feature_names, reference = artifacts
+    compiled = compile_model(model, scaler, feature_names)
+    rows = reference[feature_names].head(20).copy()
+    rows.iloc[::2, [feature_names.index('chol'), feature_names.index('thal')]] = np.nan
+    assert leaf_mismatches(compiled, model, scaler, rows) == 0
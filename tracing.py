@@ -0,0 +1,210 @@
+# tracing.py
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Tracing aktif hanya jika TRACE_JSONL berisi path file tujuan, mis. TRACE_JSONL=traces.jsonl
+TRACE_PATH = os.getenv("TRACE_JSONL")
+
+_current = ContextVar("current_trace", default=None)
+_write_lock = threading.Lock()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Satu catatan per rerun/permintaan: durasi tiap tahap (ms) dan atribut tambahan (mis. cache hit)."""
+
+    __slots__ = ("kind", "session_id", "started_at", "_start", "spans", "attrs")
+
+    def __init__(self, kind, session_id=None):
+        self.kind = kind
+        self.session_id = session_id or uuid.uuid4().hex
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = {}
+        self.attrs = {}
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds * 1000.0
+
+    def to_record(self):
+        return {
+            "ts": self.started_at,
+            "kind": self.kind,
+            "session_id": self.session_id,
+            "total_ms": (time.perf_counter() - self._start) * 1000.0,
+            "spans": self.spans,
+            "attrs": self.attrs,
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def is_enabled():
+    return TRACE_PATH is not None
+
+
+def span(name):
+    """Mengukur durasi satu tahap pada trace aktif. Tanpa trace aktif, tidak melakukan apa-apa."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def add_duration(name, seconds):
+    """Menambahkan durasi yang diukur di tempat lain (mis. time-to-first-token) ke trace aktif."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(name, seconds)
+
+
+def annotate(key, value):
+    """Menambahkan atribut (mis. `llm_cache='disk'`) ke trace aktif, jika ada."""
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs[key] = value
+
+
+def _write(record, path):
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+@contextmanager
+def traced(kind, session_id=None, path=None):
+    """
+    Membuka trace untuk satu rerun Streamlit atau satu permintaan, lalu menulis satu baris JSON ke
+    sink saat selesai. Rerun yang dihentikan oleh `st.rerun()`/`st.stop()` tetap tercatat, dengan
+    nama exception-nya di atribut `exit`.
+    """
+    path = path or TRACE_PATH
+    if path is None:
+        yield None
+        return
+
+    trace = Trace(kind, session_id)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.attrs["exit"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        try:
+            _write(trace.to_record(), path)
+        except OSError:
+            # Kegagalan menulis trace tidak boleh mengganggu aplikasi
+            pass
+
+
+# --- Agregasi file trace menjadi tabel persentil ---
+
+def _percentile(sorted_values, q):
+    index = min(int(round(q / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(paths, kind=None):
+    """Membaca file-file JSONL dan mengembalikan statistik persentil per tahap serta hitungan atribut."""
+    durations = {}
+    attr_counts = {}
+    n_records = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "spans" not in record or (kind and record.get("kind") != kind):
+                    continue
+                n_records += 1
+                durations.setdefault("total", []).append(record.get("total_ms", 0.0))
+                for name, ms in record["spans"].items():
+                    durations.setdefault(name, []).append(ms)
+                for key, value in record.get("attrs", {}).items():
+                    if isinstance(value, (str, bool)):
+                        counts = attr_counts.setdefault(key, {})
+                        counts[str(value)] = counts.get(str(value), 0) + 1
+
+    stages = {}
+    for name, values in durations.items():
+        values.sort()
+        stages[name] = {
+            "count": len(values),
+            "p50": _percentile(values, 50),
+            "p90": _percentile(values, 90),
+            "p99": _percentile(values, 99),
+            "max": values[-1],
+        }
+    return {"records": n_records, "stages": stages, "attrs": attr_counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ringkas file trace JSONL menjadi tabel persentil per tahap.")
+    parser.add_argument("paths", nargs="+", help="File atau pola glob, mis. 'traces*.jsonl'.")
+    parser.add_argument("--kind", help="Hanya catatan dengan jenis ini (mis. rerun, request, batch).")
+    parser.add_argument("--json", action="store_true", help="Cetak hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.paths for p in glob.glob(pattern)})
+    if not paths:
+        print("Tidak ada file trace yang cocok.", file=sys.stderr)
+        sys.exit(1)
+
+    summary = summarize(paths, kind=args.kind)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{summary['records']} catatan dari {len(paths)} file\n")
+    print(f"{'Tahap':<20}{'n':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in sorted(summary["stages"].items(), key=lambda item: -item[1]["p50"]):
+        print(f"{name:<20}{s['count']:>8}{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}")
+    for key, counts in summary["attrs"].items():
+        print(f"\n{key}: " + ", ".join(f"{value}={n}" for value, n in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# train_model.py
+
+import argparse
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = 'heart_disease_data.xlsx'
+TARGET_COLUMN = 'num'
+FEATURE_NAMES = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
+                 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+METRICS_PATH = 'model_metrics.json'
+
+# Ruang pencarian hyperparameter. Setiap kombinasi dievaluasi pada setiap fold.
+PARAM_GRID = {
+    'max_depth': [2, 3, 4, 5],
+    'learning_rate': [0.03, 0.1, 0.3],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0],
+    'min_child_weight': [1, 3],
+}
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 30
+# Porsi data latih tiap fold yang disisihkan khusus untuk early stopping
+EARLY_STOPPING_FRACTION = 0.2
+
+# Data latih per proses worker, dikirim sekali lewat initializer (bukan per tugas)
+_worker_data = {}
+
+
+def load_dataset(path=DATA_PATH):
+    """Membaca data referensi; target `num` > 0 berarti ada penyakit jantung."""
+    df = pd.read_excel(path)
+    df[FEATURE_NAMES + [TARGET_COLUMN]] = df[FEATURE_NAMES + [TARGET_COLUMN]].apply(pd.to_numeric, errors='coerce')
+    df = df.dropna(subset=FEATURE_NAMES + [TARGET_COLUMN]).reset_index(drop=True)
+    return df[FEATURE_NAMES], (df[TARGET_COLUMN] > 0).astype(int)
+
+
+def param_candidates(n_iter=None, seed=0):
+    """Seluruh grid, atau `n_iter` kombinasi yang diambil acak (deterministik menurut `seed`)."""
+    keys = sorted(PARAM_GRID)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(PARAM_GRID[k] for k in keys))]
+    if n_iter and n_iter < len(grid):
+        rng = np.random.default_rng(seed)
+        grid = [grid[i] for i in sorted(rng.choice(len(grid), size=n_iter, replace=False))]
+    return grid
+
+
+def _init_worker(X, y):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+
+def _evaluate_fold(task):
+    """
+    Satu unit kerja: satu kombinasi parameter pada satu fold (XGBoost satu thread). Early stopping
+    memakai split internal dari data latih fold, sehingga fold validasi hanya dipakai untuk skor AUC.
+    """
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import MinMaxScaler
+    from xgboost import XGBClassifier
+
+    candidate_index, params, train_idx, valid_idx, seed = task
+    X, y = _worker_data['X'], _worker_data['y']
+    fit_idx, stop_idx = train_test_split(train_idx, test_size=EARLY_STOPPING_FRACTION, stratify=y[train_idx],
+                                         random_state=seed)
+    scaler = MinMaxScaler().fit(X[fit_idx])
+    model = XGBClassifier(**params, n_estimators=MAX_ROUNDS, early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                          eval_metric='logloss', tree_method='hist', random_state=seed, n_jobs=1)
+    model.fit(scaler.transform(X[fit_idx]), y[fit_idx], eval_set=[(scaler.transform(X[stop_idx]), y[stop_idx])],
+              verbose=False)
+    auc = roc_auc_score(y[valid_idx], model.predict_proba(scaler.transform(X[valid_idx]))[:, 1])
+    return candidate_index, auc, model.best_iteration + 1
+
+
+def cross_validate(X, y, candidates, folds=5, seed=0, jobs=None):
+    """
+    Menilai semua kandidat dengan stratified k-fold secara paralel di `jobs` proses. Unit kerjanya
+    (kandidat x fold) saling independen dan hasil dikumpulkan menurut indeks, sehingga hasilnya sama
+    berapa pun jumlah proses dan urutan selesainya.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    tasks = [(i, params, train_idx, valid_idx, seed)
+             for i, params in enumerate(candidates) for train_idx, valid_idx in splits]
+
+    jobs = jobs or os.cpu_count() or 1
+    scores = [[] for _ in candidates]
+    rounds = [[] for _ in candidates]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(X, y)) as pool:
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        for candidate_index, auc, best_rounds in pool.map(_evaluate_fold, tasks, chunksize=chunksize):
+            scores[candidate_index].append(auc)
+            rounds[candidate_index].append(best_rounds)
+
+    results = [
+        {"params": params, "auc_mean": float(np.mean(scores[i])), "auc_std": float(np.std(scores[i])),
+         "n_estimators": int(round(np.mean(rounds[i])))}
+        for i, params in enumerate(candidates)
+    ]
+    # Urutan stabil: AUC tertinggi, lalu indeks kandidat (max() mengambil yang pertama jika seri)
+    best = max(range(len(results)), key=lambda i: (results[i]["auc_mean"], -i))
+    return results, results[best]
+
+
+def holdout_metrics(y_true, proba):
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+    pred = (proba > 0.5).astype(int)
+    return {
+        "Akurasi": round(float(accuracy_score(y_true, pred)), 4),
+        "Presisi": round(float(precision_score(y_true, pred, zero_division=0)), 4),
+        "Recall": round(float(recall_score(y_true, pred, zero_division=0)), 4),
+        "F1-Score": round(float(f1_score(y_true, pred, zero_division=0)), 4),
+        "AUC-ROC": round(float(roc_auc_score(y_true, proba)), 4),
+    }
+
+
+def train(data_path=DATA_PATH, seed=42, folds=5, test_size=0.2, n_iter=None, jobs=None):
+    """
+    Pipeline lengkap: split hold-out terstratifikasi, pencarian hyperparameter dengan CV + early
+    stopping, lalu latih ulang model terbaik pada seluruh data latih dan ukur metriknya pada hold-out.
+    Mengembalikan (model, scaler, evaluation_metrics, info_pelatihan).
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import MinMaxScaler
+    from xgboost import XGBClassifier
+
+    X_df, y_series = load_dataset(data_path)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_df, y_series, test_size=test_size, stratify=y_series, random_state=seed)
+
+    start = time.perf_counter()
+    candidates = param_candidates(n_iter, seed)
+    results, best = cross_validate(X_train.to_numpy(dtype=float), y_train.to_numpy(), candidates,
+                                   folds=folds, seed=seed, jobs=jobs)
+    search_seconds = time.perf_counter() - start
+
+    # Scaler dilatih pada DataFrame agar nama fitur ikut tersimpan, sama seperti pemakaian di aplikasi
+    scaler = MinMaxScaler().fit(X_train)
+    model = XGBClassifier(**best["params"], n_estimators=best["n_estimators"], eval_metric='logloss',
+                          tree_method='hist', random_state=seed, n_jobs=jobs or -1)
+    model.fit(pd.DataFrame(scaler.transform(X_train), columns=FEATURE_NAMES), y_train)
+
+    proba = model.predict_proba(pd.DataFrame(scaler.transform(X_test), columns=FEATURE_NAMES))[:, 1]
+    evaluation_metrics = holdout_metrics(y_test.to_numpy(), proba)
+    info = {
+        "seed": seed, "folds": folds, "test_size": test_size, "n_train": len(X_train), "n_test": len(X_test),
+        "candidates": len(candidates), "jobs": jobs or os.cpu_count(), "search_seconds": round(search_seconds, 3),
+        "best_params": best["params"], "best_n_estimators": best["n_estimators"],
+        "cv_auc_mean": round(best["auc_mean"], 4), "cv_auc_std": round(best["auc_std"], 4),
+    }
+    return model, scaler, evaluation_metrics, info
+
+
+def save_artifacts(model, scaler, evaluation_metrics, info, bundle_dir=None, data_path=DATA_PATH):
+    """
+    Menulis best_xgb_model.pkl, minmaxscaler.pkl, dan model_metrics.json (dibaca `load_metadata`),
+    serta bundle ter-mmap baru jika `bundle_dir` diberikan. Bundle membuat aplikasi beralih ke model
+    terkompilasi, jadi bundle hanya ditulis jika setiap baris data mendarat di daun yang sama dengan
+    booster yang metriknya diukur.
+    """
+    with open('best_xgb_model.pkl', 'wb') as f:
+        pickle.dump(model, f)
+    with open('minmaxscaler.pkl', 'wb') as f:
+        pickle.dump(scaler, f)
+    with open(METRICS_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"feature_names": FEATURE_NAMES, "evaluation_metrics": evaluation_metrics, "training": info},
+                  f, indent=2)
+
+    if bundle_dir is None:
+        return None
+    from compiled_model import compile_model, leaf_mismatches
+    from model_bundle import BUNDLE_SUFFIX, write_bundle
+
+    compiled = compile_model(model, scaler, FEATURE_NAMES)
+    mismatches = leaf_mismatches(compiled, model, scaler, load_dataset(data_path)[0])
+    if mismatches:
+        raise ValueError(f"Model terkompilasi berbeda dari booster pada {mismatches} baris; bundle tidak ditulis.")
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    version = int(time.time())
+    path = os.path.join(bundle_dir, f"heart-{version}{BUNDLE_SUFFIX}")
+    write_bundle(path, compiled, evaluation_metrics, version=version, extra={"training": info})
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Melatih ulang model XGBoost dan mengukur metriknya.")
+    parser.add_argument("--data", default=DATA_PATH, help="File data latih (xlsx).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-size", type=float, default=0.2, help="Proporsi data hold-out untuk metrik.")
+    parser.add_argument("--n-iter", type=int, help="Ambil sampel acak sejumlah kandidat dari grid.")
+    parser.add_argument("--jobs", type=int, help="Jumlah proses paralel (default: semua core).")
+    parser.add_argument("--bundle-dir", metavar="DIR",
+                        help="Tulis juga bundle ter-mmap ke direktori ini (aplikasi akan memakai bundle, "
+                             "mis. 'model_bundles'). Default: hanya file pickle.")
+    args = parser.parse_args()
+
+    model, scaler, evaluation_metrics, info = train(args.data, seed=args.seed, folds=args.folds,
+                                                    test_size=args.test_size, n_iter=args.n_iter, jobs=args.jobs)
+    bundle_path = save_artifacts(model, scaler, evaluation_metrics, info, args.bundle_dir, data_path=args.data)
+
+    print(f"{info['candidates']} kandidat x {info['folds']} fold dalam {info['search_seconds']:.1f} detik "
+          f"({info['jobs']} proses).")
+    print(f"Parameter terbaik: {info['best_params']}, n_estimators={info['best_n_estimators']} "
+          f"(AUC CV {info['cv_auc_mean']:.4f} ± {info['cv_auc_std']:.4f})")
+    for name, value in evaluation_metrics.items():
+        print(f"  {name:<10}{value:.4f}")
+    if bundle_path:
+        print(f"Bundle ditulis ke '{bundle_path}'.")
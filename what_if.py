@@ -0,0 +1,103 @@
+# what_if.py
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from batch_scoring import score_frame
+from klasifikasi import get_model_and_version
+
+# Faktor yang dapat dimodifikasi beserta rentang simulasi (mengikuti batas pada formulir)
+WHAT_IF_FEATURES = {
+    'chol': ("Kolesterol Serum (mg/dl)", 100.0, 600.0),
+    'trestbps': ("Tekanan Darah Istirahat (mmHg)", 50.0, 200.0),
+    'thalach': ("Detak Jantung Maksimum (bpm)", 60.0, 220.0),
+    'oldpeak': ("Depresi ST (oldpeak)", 0.0, 6.2),
+}
+
+
+def build_grid(base_row, feature_x, values_x, feature_y=None, values_y=None):
+    """
+    Mengulang data satu pasien untuk setiap titik grid dan mengganti nilai faktor yang disimulasikan.
+    Grid 2-D disusun dengan `feature_x` berubah paling cepat.
+    """
+    if feature_y is None:
+        grid = pd.DataFrame({feature_x: values_x})
+    else:
+        xx, yy = np.meshgrid(values_x, values_y)
+        grid = pd.DataFrame({feature_x: xx.ravel(), feature_y: yy.ravel()})
+    for column, value in base_row.items():
+        if column not in grid.columns:
+            grid[column] = value
+    return grid
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def risk_grid(_model, _scaler, feature_names, patient, feature_x, feature_y=None, steps=50, model_tag=None):
+    """
+    Probabilitas risiko untuk seluruh grid dengan satu pemanggilan `predict_proba`.
+    Hasil di-memoize per pasien (`patient` berupa tuple nilai fitur), per pengaturan grid, dan per
+    versi model (`model_tag`), sehingga kurva dihitung ulang setelah bundle baru dimuat atau model dilatih ulang.
+    """
+    base_row = dict(zip(feature_names, patient))
+    _, lo_x, hi_x = WHAT_IF_FEATURES[feature_x]
+    values_x = np.linspace(lo_x, hi_x, steps)
+    values_y = None
+    if feature_y is not None:
+        _, lo_y, hi_y = WHAT_IF_FEATURES[feature_y]
+        values_y = np.linspace(lo_y, hi_y, steps)
+
+    grid = build_grid(base_row, feature_x, values_x, feature_y, values_y)
+    _, prediction_proba = score_frame(_model, _scaler, feature_names, grid)
+    grid['probabilitas'] = prediction_proba[:, 1]
+    return grid[[c for c in (feature_x, feature_y) if c] + ['probabilitas']]
+
+
+def render_what_if_panel(feature_names):
+    """Panel simulasi 'bagaimana jika' untuk faktor risiko yang dapat dimodifikasi."""
+    user_df = st.session_state.get("user_df")
+    if user_df is None:
+        return
+
+    with st.expander("🔁 Simulasi What-If: Bagaimana Jika Nilai Saya Berubah?"):
+        options = list(WHAT_IF_FEATURES)
+        c1, c2 = st.columns(2)
+        with c1:
+            feature_x = st.selectbox("Faktor yang disimulasikan", options,
+                                     format_func=lambda f: WHAT_IF_FEATURES[f][0], key="what_if_x")
+        with c2:
+            second = st.selectbox("Kombinasikan dengan (opsional)", ["-"] + [f for f in options if f != feature_x],
+                                  format_func=lambda f: "Tidak ada" if f == "-" else WHAT_IF_FEATURES[f][0],
+                                  key="what_if_y")
+        feature_y = None if second == "-" else second
+
+        model, scaler, version = get_model_and_version()
+        if model is None:
+            return
+
+        patient = tuple(float(v) for v in user_df[feature_names].iloc[0])
+        curve = risk_grid(model, scaler, list(feature_names), patient, feature_x, feature_y, model_tag=version)
+        current_x = float(user_df[feature_x].iloc[0])
+
+        if feature_y is None:
+            st.line_chart(curve.set_index(feature_x)['probabilitas'], height=280)
+            st.caption(f"Nilai Anda saat ini: {current_x:g}. Garis menunjukkan probabilitas risiko jika hanya "
+                       f"{WHAT_IF_FEATURES[feature_x][0].split(' (')[0].lower()} yang berubah.")
+        else:
+            import altair as alt
+
+            heatmap = alt.Chart(curve).mark_rect().encode(
+                x=alt.X(f"{feature_x}:O", title=WHAT_IF_FEATURES[feature_x][0],
+                        axis=alt.Axis(format=".0f", labelOverlap=True)),
+                y=alt.Y(f"{feature_y}:O", title=WHAT_IF_FEATURES[feature_y][0], sort="descending",
+                        axis=alt.Axis(format=".1f", labelOverlap=True)),
+                color=alt.Color("probabilitas:Q", scale=alt.Scale(scheme="redyellowgreen", reverse=True, domain=[0, 1]),
+                                title="Probabilitas"),
+                tooltip=[feature_x, feature_y, alt.Tooltip("probabilitas:Q", format=".1%")],
+            ).properties(height=360)
+            st.altair_chart(heatmap, use_container_width=True)
+            current_y = float(user_df[feature_y].iloc[0])
+            st.caption(f"Nilai Anda saat ini: {feature_x}={current_x:g}, {feature_y}={current_y:g}.")
+
+        st.markdown("<i>Simulasi ini hanya menggambarkan perilaku model, bukan jaminan perubahan risiko klinis. "
+                    "Diskusikan target nilai yang sesuai dengan dokter Anda.</i>", unsafe_allow_html=True)